@@ -0,0 +1,58 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasheet_scraper', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datasheetjson',
+            name='data_body',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddField(
+            model_name='datasheetjson',
+            name='data_body_gzip',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddField(
+            model_name='datasheetjson',
+            name='data_etag',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='detachmentjson',
+            name='data_body',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddField(
+            model_name='detachmentjson',
+            name='data_body_gzip',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddField(
+            model_name='detachmentjson',
+            name='data_etag',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='factionjson',
+            name='data_body',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddField(
+            model_name='factionjson',
+            name='data_body_gzip',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddField(
+            model_name='factionjson',
+            name='data_etag',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32),
+        ),
+    ]
@@ -0,0 +1,31 @@
+import gzip
+import hashlib
+import json
+
+from django.db import migrations
+
+
+def _serialize(data):
+    # frozen copy of datasheet_scraper.models.serialize_data at the time of this migration
+    body = json.dumps(data, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode()
+    return body, gzip.compress(body, compresslevel=9, mtime=0), hashlib.sha256(body).hexdigest()[:32]
+
+
+def backfill(apps, schema_editor):
+    """Pre-serialize the rows scraped before data_body existed."""
+    for model_name in ("FactionJson", "DetachmentJson", "DatasheetJson"):
+        model = apps.get_model("datasheet_scraper", model_name)
+        for pk, data in model.objects.filter(data_body__isnull=True).values_list("pk", "data").iterator():
+            body, body_gzip, etag = _serialize(data)
+            model.objects.filter(pk=pk).update(data_body=body, data_body_gzip=body_gzip, data_etag=etag)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasheet_scraper', '0002_data_body'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
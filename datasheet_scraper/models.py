@@ -1,11 +1,36 @@
+import gzip
+import hashlib
+import json
+
 from django.db import models
 
+
+def serialize_data(data):
+    """
+    Canonical JSON body of an entity's data, its gzip variant and a content ETag,
+    so the game-data endpoints can send bytes without a decode/encode round trip.
+    """
+    body = json.dumps(data, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode()
+    return body, gzip.compress(body, compresslevel=9, mtime=0), hashlib.sha256(body).hexdigest()[:32]
+
+
 class BaseModel(models.Model):
     """
-    Abstract base model with common fields
+    Abstract base model with common fields. Subclasses hold their scraped JSON in
+    `data`; save() keeps the pre-serialized copies of it in sync.
     """
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    data_body = models.BinaryField(null=True, editable=False)
+    data_body_gzip = models.BinaryField(null=True, editable=False)
+    data_etag = models.CharField(max_length=32, blank=True, default="", editable=False)
+
+    def save(self, *args, **kwargs):
+        self.data_body, self.data_body_gzip, self.data_etag = serialize_data(self.data)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "data" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "data_body", "data_body_gzip", "data_etag"}
+        super().save(*args, **kwargs)
 
     class Meta:
         abstract = True
@@ -0,0 +1,24 @@
+import re
+from typing import Dict, Iterable, Optional
+
+INT_PAT = re.compile(r"\d+")
+
+
+def _first_int(text) -> Optional[int]:
+    m = INT_PAT.search(str(text or "").replace(",", ""))
+    return int(m.group(0)) if m else None
+
+
+def build_points_table(composition_table: Iterable[Dict]) -> Dict[str, int]:
+    """
+    Scraped `unit_composition_table` rows -> {"<model count>": points}.
+    The model count comes from the "count" column, falling back to the "model"
+    text ('5 models'). Keys are strings so the table can be stored as JSON.
+    """
+    table: Dict[str, int] = {}
+    for row in composition_table or []:
+        models = _first_int(row.get("count")) or _first_int(row.get("model"))
+        points = _first_int(row.get("points"))
+        if models and points is not None:
+            table.setdefault(str(models), points)
+    return table
@@ -15,6 +15,7 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from datasheet_scraper.utils import chrome_driver
+from datasheet_scraper.points import build_points_table
 
 BASE = "https://39k.pro/datasheet/"
 
@@ -325,6 +326,8 @@ def scrape_datasheet_once(driver, url, faction_name, faction_id, datasheet_id) -
         "wargear_options": wargear_options,
         "unit_composition": unit_composition,
         "unit_composition_table": unit_composition_table,
+        # {"<model count>": points}, precomputed for list validation
+        "points_by_models": build_points_table(unit_composition_table),
         "leader": leader,
         "led_by": led_by,
         "keywords": keywords,
@@ -8,6 +8,7 @@ from datasheet_scraper.models import FactionJson, DetachmentJson, DatasheetJson
 from datasheet_scraper.scripts.faction_scraper import scrape_factions
 from datasheet_scraper.scripts.detachment_scraper import scrape_detachments
 from datasheet_scraper.scripts.datasheet_scraper import scrape_datasheets
+from list_parser.utils.catalog import publish_catalog_generation
 
 logger = get_task_logger(__name__)
 
@@ -86,12 +87,17 @@ def full_scrape_task(self):
         logger.info("Clearing all Redis cache")
         call_command("clear_entity_cache")
 
+        # Publish the new catalog generation so web processes rebuild their snapshot
+        catalog_generation = publish_catalog_generation()
+        logger.info(f"Published catalog generation {catalog_generation}")
+
         result = {
             "status": "completed",
             "faction_count": len(faction_results),
             "detachment_count": len(detachment_results),
             "datasheet_count": len(datasheet_results),
             "cache_cleared": True,
+            "catalog_generation": catalog_generation,
             "completed_at": timezone.now().isoformat(),
         }
 
@@ -8,4 +8,4 @@ echo "Running database migrations..."
 python manage.py migrate --noinput
 
 echo "Starting gunicorn..."
-exec gunicorn --bind 0.0.0.0:8000 --timeout 120 --workers 2 --limit-request-line 0 warhammer_list_parser.wsgi:application
\ No newline at end of file
+exec gunicorn --bind 0.0.0.0:8000 --timeout 120 --workers 2 --worker-class gthread --threads 4 --limit-request-line 0 warhammer_list_parser.wsgi:application
\ No newline at end of file
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import SharedList
+from .models import SharedList, SharedListContent
 
 
 @admin.register(SharedList)
@@ -10,8 +10,9 @@ class SharedListAdmin(admin.ModelAdmin):
     """
     list_display = ('name', 'slug_link', 'view_count', 'created_at', 'list_preview')
     list_filter = ('created_at', 'view_count')
-    search_fields = ('name', 'slug', 'raw_text')
-    readonly_fields = ('slug', 'created_at', 'view_count', 'formatted_parsed_data')
+    search_fields = ('name', 'slug', 'content__raw_text')
+    readonly_fields = ('slug', 'created_at', 'view_count', 'raw_text', 'formatted_parsed_data')
+    list_select_related = ('content',)
     ordering = ('-created_at',)
     list_per_page = 50
 
@@ -34,10 +35,15 @@ class SharedListAdmin(admin.ModelAdmin):
         return format_html('<a href="{}" target="_blank">{}</a>', url, obj.slug)
     slug_link.short_description = 'Slug (Link)'
 
+    def raw_text(self, obj):
+        """The shared text (stored once in SharedListContent)"""
+        return obj.content.raw_text
+    raw_text.short_description = 'Raw text'
+
     def list_preview(self, obj):
         """Display a preview of the raw text"""
-        preview = obj.raw_text[:100]
-        if len(obj.raw_text) > 100:
+        preview = obj.content.raw_text[:100]
+        if len(obj.content.raw_text) > 100:
             preview += '...'
         return preview
     list_preview.short_description = 'Preview'
@@ -46,10 +52,10 @@ class SharedListAdmin(admin.ModelAdmin):
         """Display formatted parsed data as JSON"""
         import json
         try:
-            formatted_json = json.dumps(obj.parsed_data, indent=2)
+            formatted_json = json.dumps(obj.content.parsed_data, indent=2)
             return format_html('<pre style="max-height: 400px; overflow: auto;">{}</pre>', formatted_json)
         except (TypeError, ValueError):
-            return str(obj.parsed_data)
+            return str(obj.content.parsed_data)
     formatted_parsed_data.short_description = 'Parsed Data (JSON)'
 
     actions = ['reset_view_count', 'delete_selected']
@@ -59,3 +65,15 @@ class SharedListAdmin(admin.ModelAdmin):
         count = queryset.update(view_count=0)
         self.message_user(request, f'Successfully reset view count for {count} list(s).')
     reset_view_count.short_description = 'Reset view count to 0'
+
+
+@admin.register(SharedListContent)
+class SharedListContentAdmin(admin.ModelAdmin):
+    """
+    Admin interface for deduplicated shared-list content
+    """
+    list_display = ('content_hash', 'catalog_generation', 'created_at')
+    search_fields = ('content_hash', 'raw_text')
+    readonly_fields = ('content_hash', 'catalog_generation', 'created_at')
+    ordering = ('-created_at',)
+    list_per_page = 50
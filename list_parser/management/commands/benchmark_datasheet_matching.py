@@ -0,0 +1,126 @@
+"""
+Django management command to benchmark the datasheet scorer cascade.
+
+Builds a labelled corpus of perturbed datasheet headers from the current catalog,
+resolves it with the pre-batching resolver (per-query `process.extract` with every
+scorer), with every scorer batched and with the cascade, and reports timing,
+agreement, accuracy against the labels and how often the cascade exited early.
+The header memo is emptied before each run so no run reuses another's results.
+
+Usage:
+    python manage.py benchmark_datasheet_matching [--samples 500] [--seed 7]
+"""
+
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rapidfuzz import fuzz, process
+
+from list_parser.utils import detect_datasheets
+from list_parser.utils.catalog import get_catalog_snapshot
+
+
+def _perturb(name: str, rng: random.Random) -> str:
+    """Typos, extra words and truncation, like hand-typed or reformatted lists."""
+    chars = list(name)
+    for _ in range(rng.randint(1, 3)):
+        op = rng.random()
+        i = rng.randrange(len(chars))
+        if op < 0.3 and len(chars) > 1:
+            del chars[i]
+        elif op < 0.6:
+            chars.insert(i, rng.choice("abcdefghij "))
+        elif op < 0.8:
+            chars[i] = rng.choice("xyzqw")
+        else:
+            chars.extend(rng.choice([" Squad", " Unit", " w/ Upgrades"]))
+    return "".join(chars).strip() or name
+
+
+def _baseline_resolve(groups, catalog_all, hi=92, lo=70, prefer_bonus=8, k=12):
+    """
+    The resolver as it was before batched matching: for each header, top-`k` per
+    scorer with `process.extract`, best score per choice, then the preferred-faction
+    bonus. Returns the datasheet id (or None) per group's first block.
+    """
+    names = [d["datasheet_name"] for d in catalog_all]
+    ids = []
+    for blocks, preferred in groups:
+        query = detect_datasheets._header_to_query(blocks[0]["header"])
+        res = []
+        for scorer in (fuzz.WRatio, fuzz.token_sort_ratio, fuzz.token_set_ratio, fuzz.partial_ratio):
+            res.extend(process.extract(query, names, scorer=scorer, limit=k))
+        best = {}
+        for _, score, idx in res:
+            if idx not in best or score > best[idx]:
+                best[idx] = int(score)
+        top = sorted(best.items(), key=lambda x: x[1], reverse=True)[:k]
+        ranked = sorted(
+            (
+                (raw + (prefer_bonus if catalog_all[idx]["faction_id"] in preferred else 0), raw, idx)
+                for idx, raw in top
+            ),
+            key=lambda r: (r[0], r[1]),
+            reverse=True,
+        )
+        ids.append(catalog_all[ranked[0][2]]["datasheet_id"] if ranked and ranked[0][1] >= lo else None)
+    return ids
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the datasheet scorer cascade against full scoring and the pre-batching resolver'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=500, help='Number of headers')
+        parser.add_argument('--seed', type=int, default=7, help='Random seed for the corpus')
+
+    def handle(self, *args, **options):
+        snapshot = get_catalog_snapshot()
+        if not snapshot.datasheets:
+            self.stdout.write(self.style.ERROR('No datasheets in the catalog'))
+            return
+
+        rng = random.Random(options['seed'])
+        groups, labels = [], []
+        for _ in range(options['samples']):
+            ds = rng.choice(snapshot.datasheets)
+            header = f"{_perturb(ds['datasheet_name'], rng)} ({rng.randint(20, 400)} points)"
+            preferred = [ds['faction_id']] if rng.random() < 0.8 else []
+            groups.append(([{"header": header, "entry_text": header}], preferred))
+            labels.append(ds['datasheet_id'])
+
+        runs = {}
+        start = time.perf_counter()
+        baseline = _baseline_resolve(groups, snapshot.datasheets)
+        runs["baseline"] = (baseline, time.perf_counter() - start)
+        self._report("baseline", runs["baseline"], labels)
+        for label, cascade in (("full", False), ("cascade", True)):
+            detect_datasheets._header_memo.clear()
+            before = detect_datasheets.cascade_stats()
+            with override_settings(DATASHEET_CASCADE=cascade):
+                start = time.perf_counter()
+                outs = detect_datasheets.resolve_block_groups_to_datasheets_prefer(
+                    groups, snapshot.datasheets, snapshot=snapshot
+                )
+                elapsed = time.perf_counter() - start
+            after = detect_datasheets.cascade_stats()
+            runs[label] = ([out[0]["datasheet_id"] for out in outs], elapsed)
+            self._report(label, runs[label], labels)
+
+        rows = after["rows"] - before["rows"]
+        early = after["early_exits"] - before["early_exits"]
+        self.stdout.write(f"fuzzy-scored rows {rows}, early exits {early}"
+                          + (f" ({early / rows:.1%})" if rows else ""))
+        for label in ("full", "baseline"):
+            mismatches = sum(a != b for a, b in zip(runs[label][0], runs["cascade"][0]))
+            style = self.style.SUCCESS if mismatches == 0 else self.style.WARNING
+            self.stdout.write(style(f"cascade vs {label} mismatches: {mismatches} of {len(labels)}"))
+
+    def _report(self, label, run, labels):
+        ids, elapsed = run
+        self.stdout.write(
+            f"{label:8s} {elapsed * 1000:8.1f} ms  "
+            f"accuracy {sum(a == b for a, b in zip(ids, labels)) / len(labels):.3f}"
+        )
@@ -9,6 +9,8 @@ from django.core.management.base import BaseCommand
 from django.core.cache import cache
 import logging
 
+from list_parser.utils.view_counts import flush_view_counts
+
 logger = logging.getLogger(__name__)
 
 
@@ -17,6 +19,10 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         try:
+            # clearing Redis would drop the buffered shared-list views
+            flushed = flush_view_counts()
+            if flushed:
+                self.stdout.write(f'Flushed {flushed} buffered shared list views')
             cache.clear()
             self.stdout.write(
                 self.style.SUCCESS('Successfully cleared all Redis cache')
@@ -35,6 +35,9 @@ class RequestResponseLoggingMiddleware:
                 "duration_ms": round(duration * 1000, 2),
             }
 
+            if response.has_header("X-Detection-Cache"):
+                log_data["detection_cache"] = response["X-Detection-Cache"]
+
             # Add request body for POST requests
             if request.method == "POST" and hasattr(request, "body"):
                 try:
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('list_parser', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sharedlist',
+            name='catalog_generation',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('list_parser', '0002_sharedlist_catalog_generation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SharedListContent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('raw_text', models.TextField()),
+                ('parsed_data', models.JSONField()),
+                ('catalog_generation', models.CharField(blank=True, default='', max_length=32)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='sharedlist',
+            name='content',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='shared_lists', to='list_parser.sharedlistcontent'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+import hashlib
+
+from django.db import migrations
+
+
+def _content_hash(raw_text):
+    # frozen copy of utils.result_cache.content_hash at the time of this migration
+    lines = raw_text.splitlines()
+    while lines and not lines[-1].strip():
+        lines.pop()
+    return hashlib.sha256("\n".join(lines).encode()).hexdigest()
+
+
+def move_content(apps, schema_editor):
+    """Point every shared list at one content row per distinct text."""
+    SharedList = apps.get_model("list_parser", "SharedList")
+    SharedListContent = apps.get_model("list_parser", "SharedListContent")
+    by_hash = {}
+    for shared_list in SharedList.objects.order_by("created_at").iterator():
+        content_hash = _content_hash(shared_list.raw_text)
+        content = by_hash.get(content_hash)
+        if content is None:
+            content = by_hash[content_hash] = SharedListContent.objects.create(
+                content_hash=content_hash,
+                raw_text=shared_list.raw_text,
+                parsed_data=shared_list.parsed_data,
+                catalog_generation=shared_list.catalog_generation,
+                created_at=shared_list.created_at,
+            )
+        shared_list.content_id = content.pk
+        shared_list.save(update_fields=["content"])
+
+
+def restore_content(apps, schema_editor):
+    SharedList = apps.get_model("list_parser", "SharedList")
+    for shared_list in SharedList.objects.select_related("content").iterator():
+        shared_list.raw_text = shared_list.content.raw_text
+        shared_list.parsed_data = shared_list.content.parsed_data
+        shared_list.catalog_generation = shared_list.content.catalog_generation
+        shared_list.save(update_fields=["raw_text", "parsed_data", "catalog_generation"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('list_parser', '0003_sharedlistcontent'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_content, restore_content),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('list_parser', '0004_move_shared_list_content'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='sharedlist',
+            name='catalog_generation',
+        ),
+        migrations.RemoveField(
+            model_name='sharedlist',
+            name='parsed_data',
+        ),
+        migrations.RemoveField(
+            model_name='sharedlist',
+            name='raw_text',
+        ),
+        migrations.AlterField(
+            model_name='sharedlist',
+            name='content',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='shared_lists', to='list_parser.sharedlistcontent'),
+        ),
+    ]
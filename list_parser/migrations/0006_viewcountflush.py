@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:34
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('list_parser', '0005_sharedlist_content_required'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ViewCountFlush',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('flush_id', models.CharField(max_length=32, unique=True)),
+                ('applied_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -1,39 +1,80 @@
-from django.db import models
+import secrets
 import string
-import random
+
+from django.db import IntegrityError, models, transaction
 from django.utils import timezone
 
+SLUG_ALPHABET = string.ascii_lowercase + string.digits
+SLUG_LENGTH = 8
+# 36^8 slugs: a collision is rare, several in a row effectively impossible
+SLUG_ATTEMPTS = 5
+
+
+class SharedListContent(models.Model):
+    """
+    A shared army list's text and parse, stored once however often it is shared
+    """
+    # sha256 of the canonical text (see utils.result_cache.content_hash)
+    content_hash = models.CharField(max_length=64, unique=True)
+    raw_text = models.TextField()
+    parsed_data = models.JSONField()
+    # catalog generation parsed_data was detected against ("" = client-supplied, unvalidated)
+    catalog_generation = models.CharField(max_length=32, blank=True, default="")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"SharedListContent {self.content_hash[:12]}"
+
+
 class SharedList(models.Model):
     """
-    Model for storing shared army lists with unique slugs
+    Model for storing shared army lists with unique slugs. A lightweight row per
+    share; the text and parse live in SharedListContent, shared between rows.
     """
     slug = models.CharField(max_length=20, unique=True, db_index=True)
+    content = models.ForeignKey(
+        SharedListContent, on_delete=models.PROTECT, related_name="shared_lists"
+    )
     name = models.CharField(max_length=200)
-    raw_text = models.TextField()
-    parsed_data = models.JSONField()
     created_at = models.DateTimeField(default=timezone.now)
     view_count = models.PositiveIntegerField(default=0)
-    
+
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = self.generate_unique_slug()
-        super().save(*args, **kwargs)
-    
-    def generate_unique_slug(self):
-        """Generate a unique random slug"""
-        while True:
-            # Generate random slug (8 characters: letters and numbers)
-            slug = ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
-            if not SharedList.objects.filter(slug=slug).exists():
-                return slug
-    
+        if self.slug:
+            return super().save(*args, **kwargs)
+        # the unique index detects collisions, so no exists() probe per attempt
+        for attempt in range(SLUG_ATTEMPTS):
+            self.slug = "".join(secrets.choice(SLUG_ALPHABET) for _ in range(SLUG_LENGTH))
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                if attempt == SLUG_ATTEMPTS - 1:
+                    raise
+
     def increment_view_count(self):
-        """Increment the view count"""
-        self.view_count += 1
-        self.save(update_fields=['view_count'])
+        """
+        Count a view. Buffered in Redis and written to view_count by a periodic
+        task (see utils.view_counts); self.view_count becomes the live count.
+        """
+        from list_parser.utils.view_counts import record_view
+
+        self.view_count = record_view(self.pk, self.view_count)
     
     def __str__(self):
         return f"{self.name} ({self.slug})"
     
     class Meta:
         ordering = ['-created_at']
+
+
+class ViewCountFlush(models.Model):
+    """
+    A flush of buffered view counts that has been applied to SharedList.view_count,
+    recorded in the same transaction so a retried flush is not applied twice
+    """
+    flush_id = models.CharField(max_length=32, unique=True)
+    applied_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"ViewCountFlush {self.flush_id}"
@@ -0,0 +1,15 @@
+from celery import shared_task
+from celery.utils.log import get_task_logger
+
+from list_parser.utils.view_counts import flush_view_counts
+
+logger = get_task_logger(__name__)
+
+
+@shared_task
+def flush_shared_list_views_task():
+    """Periodic task: write the shared-list views buffered in Redis to Postgres."""
+    flushed = flush_view_counts()
+    if flushed:
+        logger.info(f"Flushed {flushed} shared list views")
+    return flushed
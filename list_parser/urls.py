@@ -5,6 +5,8 @@ urlpatterns = [
     # API endpoints
     path('health/', views.health, name='health'),
     path('api/detect-entities/', views.detect_army_entities, name='detect_army_entities'),
+    path('api/detect-entities/batch/', views.detect_army_entities_batch, name='detect_army_entities_batch'),
+    path('api/detect-entities/incremental/', views.detect_army_entities_incremental, name='detect_army_entities_incremental'),
     path('api/datasheet/<str:datasheet_id>/', views.get_datasheet, name='get_datasheet'),
     path('api/datasheet-with-enhancement/<str:datasheet_id>/', views.get_datasheet_with_enhancement, name='get_datasheet_with_enhancement'),
     path('api/faction/<str:faction_id>/', views.get_faction, name='get_faction'),
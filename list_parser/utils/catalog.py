@@ -0,0 +1,196 @@
+import threading
+import hashlib
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from datasheet_scraper.models import DatasheetJson, FactionJson, DetachmentJson
+from list_parser.utils.points import build_points_table
+from list_parser.utils.shared_utils import _norm, _strip_faction_prefix
+
+logger = logging.getLogger(__name__)
+
+CATALOG_GENERATION_KEY = "catalog_generation"
+
+
+# ---------- catalog generation ----------
+def _catalog_generation_from_db() -> str:
+    """Derive a generation id from the scraped tables (changes on every scrape)."""
+    parts = []
+    for model in (FactionJson, DetachmentJson, DatasheetJson):
+        agg = model.objects.aggregate(latest=Max("updated_at"), count=Count("id"))
+        latest = agg["latest"].isoformat() if agg["latest"] else "none"
+        parts.append(f"{model.__name__}:{agg['count']}:{latest}")
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:16]
+
+
+def publish_catalog_generation() -> str:
+    """
+    Compute the generation id of the data currently in the database and publish it,
+    so every web process rebuilds its snapshot on its next request.
+    """
+    generation = _catalog_generation_from_db()
+    cache.set(CATALOG_GENERATION_KEY, generation, timeout=None)
+    return generation
+
+
+def get_catalog_generation() -> str:
+    """Return the published generation id (falls back to the database if unpublished)."""
+    generation = cache.get(CATALOG_GENERATION_KEY)
+    if generation is None:
+        generation = publish_catalog_generation()
+    return generation
+
+
+# ---------- snapshot ----------
+class CatalogSnapshot:
+    """
+    Immutable, pre-normalized view of the scraped catalog used by the detectors.
+    Built once per catalog generation; holds no rules text.
+    """
+
+    def __init__(
+        self,
+        generation: str,
+        factions: List[Dict],
+        datasheets: List[Dict],
+        detachments_by_faction: Dict[str, List[Dict]],
+        enhancements_by_detachment: Dict[str, List[str]],
+        points_by_datasheet: Optional[Dict[str, Dict[int, int]]] = None,
+        weapons_by_datasheet: Optional[Dict[str, List[str]]] = None,
+    ):
+        self.generation = generation
+        # [{"faction_name","faction_id","is_supplement"}, ...]
+        self.factions = factions
+        # [{"datasheet_name","datasheet_id","faction_id","name_norm"}, ...]
+        self.datasheets = datasheets
+        # parallel arrays over `datasheets` for batched matching
+        self.datasheet_names = [d["name_norm"] for d in datasheets]
+        self.datasheet_faction_ids = np.array([d["faction_id"] for d in datasheets])
+        # faction_id -> [{"detachment_name","detachment_id","name_norm"}, ...]
+        self.detachments_by_faction = detachments_by_faction
+        # detachment_id -> [enhancement name, ...]
+        self.enhancements_by_detachment = enhancements_by_detachment
+        # datasheet_id -> {model count: points}
+        self.points_by_datasheet = points_by_datasheet or {}
+        # datasheet_id -> [ranged and melee weapon name, ...] (one per profile)
+        self.weapons_by_datasheet = weapons_by_datasheet or {}
+        # detector-owned indexes, built lazily once per snapshot (see get_index)
+        self._indexes: Dict[str, Any] = {}
+        self._indexes_lock = threading.Lock()
+
+    def get_index(self, name: str, build: Callable[["CatalogSnapshot"], Any]) -> Any:
+        """Return the derived index `name`, calling `build(self)` the first time."""
+        index = self._indexes.get(name)
+        if index is None:
+            with self._indexes_lock:
+                index = self._indexes.get(name)
+                if index is None:
+                    index = self._indexes[name] = build(self)
+        return index
+
+    def detachments_for_faction(self, faction_id: str) -> List[Dict]:
+        if faction_id not in self.detachments_by_faction:
+            raise ValueError(f"Faction id '{faction_id}' not found in factions json")
+        return self.detachments_by_faction[faction_id]
+
+    def enhancement_names_for_detachment(self, detachment_id: str) -> List[str]:
+        return self.enhancements_by_detachment.get(detachment_id, [])
+
+
+def load_catalog_snapshot(generation: str) -> CatalogSnapshot:
+    """Build a snapshot from the database, reading only the JSON keys detection needs."""
+    factions, datasheets, detachments_by_faction = [], [], {}
+    rows = FactionJson.objects.values(
+        "faction_id", "data__faction", "data__datasheets", "data__detachments"
+    )
+    for row in rows:
+        faction_id = row["faction_id"]
+        name, is_supplement = _strip_faction_prefix(row["data__faction"])
+        factions.append(
+            {
+                "faction_name": name,
+                "faction_id": faction_id,
+                "is_supplement": is_supplement,
+            }
+        )
+        for ds in row["data__datasheets"] or []:
+            datasheets.append(
+                {
+                    "datasheet_name": ds["datasheet_name"],
+                    "datasheet_id": ds["datasheet_id"],
+                    "faction_id": faction_id,
+                    "name_norm": _norm(ds["datasheet_name"]),
+                }
+            )
+        detachments_by_faction[faction_id] = [
+            {
+                "detachment_name": d["detachment_name"],
+                "detachment_id": d["detachment_id"],
+                "name_norm": _norm(d["detachment_name"]),
+            }
+            for d in row["data__detachments"] or []
+        ]
+
+    enhancements_by_detachment = {}
+    for row in DetachmentJson.objects.values("detachment_id", "data__enhancements"):
+        enhancements_by_detachment[row["detachment_id"]] = [
+            e["name"] for e in row["data__enhancements"] or [] if "name" in e
+        ]
+
+    points_by_datasheet, weapons_by_datasheet = {}, {}
+    rows = DatasheetJson.objects.values(
+        "datasheet_id", "data__points_by_models", "data__ranged_weapons", "data__melee_weapons"
+    )
+    for row in rows:
+        if row["data__points_by_models"] is not None:
+            points_by_datasheet[row["datasheet_id"]] = row["data__points_by_models"]
+        weapons = (row["data__ranged_weapons"] or []) + (row["data__melee_weapons"] or [])
+        weapons_by_datasheet[row["datasheet_id"]] = list(
+            dict.fromkeys(w["name"] for w in weapons if w.get("name"))
+        )
+    # datasheets scraped before points tables were precomputed
+    stale = DatasheetJson.objects.filter(data__points_by_models__isnull=True)
+    for row in stale.values("datasheet_id", "data__unit_composition_table"):
+        points_by_datasheet[row["datasheet_id"]] = build_points_table(
+            row["data__unit_composition_table"]
+        )
+
+    return CatalogSnapshot(
+        generation,
+        factions,
+        datasheets,
+        detachments_by_faction,
+        enhancements_by_detachment,
+        {
+            datasheet_id: {int(models): points for models, points in table.items()}
+            for datasheet_id, table in points_by_datasheet.items()
+            if table
+        },
+        weapons_by_datasheet,
+    )
+
+
+_snapshot: Optional[CatalogSnapshot] = None
+_snapshot_lock = threading.Lock()
+
+
+def get_catalog_snapshot() -> CatalogSnapshot:
+    """
+    Return the process-wide snapshot, rebuilding it only when a new catalog
+    generation has been published. Costs one cache read and no DB queries.
+    """
+    global _snapshot
+    generation = get_catalog_generation()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.generation == generation:
+        return snapshot
+
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot.generation != generation:
+            logger.info(f"Building catalog snapshot for generation {generation}")
+            _snapshot = load_catalog_snapshot(generation)
+        return _snapshot
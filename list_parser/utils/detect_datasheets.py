@@ -1,96 +1,522 @@
 # %pip install rapidfuzz
-import re
-from typing import List, Dict, Iterable
+import threading
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
 
+import numpy as np
+from django.conf import settings
 from rapidfuzz import process, fuzz
 
-from datasheet_scraper.models import FactionJson
+from list_parser.utils.catalog import CatalogSnapshot, get_catalog_snapshot
+from list_parser.utils.lexer import _header_query, ensure_lexed
+from list_parser.utils.lru import LRUCache
 from list_parser.utils.shared_utils import _norm
+from list_parser.utils.typo_index import correct_query, get_typo_index
 
 
-def _strip_count_prefix(name: str) -> str:
-    """Remove count prefix like '2x' from unit names."""
-    return re.sub(r"^\s*\d+\s*x\s+", "", name, flags=re.IGNORECASE).strip()
+def _header_to_query(header_line: str) -> str:
+    """Convert a header line to a clean query string."""
+    return _header_query(header_line, _norm)
 
 
-def _strip_points_suffix(name: str) -> str:
-    """Remove points cost suffix like '(100 Points)' from unit names."""
-    return re.sub(
-        r"\(\s*\d+\s*(?:pts|points?)\s*\)$", "", name, flags=re.IGNORECASE
-    ).strip()
+# ---------- Fuzzy matching utilities ----------
+COMBINED_SCORERS = (
+    fuzz.WRatio,
+    fuzz.token_sort_ratio,
+    fuzz.token_set_ratio,
+    fuzz.partial_ratio,
+)
 
 
-def _header_to_query(header_line: str) -> str:
-    """Convert a header line to a clean query string."""
-    h = header_line.strip()
-    h = _strip_count_prefix(h)
-    h = _strip_points_suffix(h)
-    return _norm(h)
+# ---------- scorer cascade ----------
+# cheapest first; WRatio (the tie-break scorer) is by far the most expensive
+CASCADE_ORDER = (
+    fuzz.token_sort_ratio,
+    fuzz.token_set_ratio,
+    fuzz.partial_ratio,
+    fuzz.WRatio,
+)
+# cascade rows are batched per scorer by score_cutoff, rounded down to this step
+# (a lower cutoff only prunes less) so one scorer makes at most a few cdist calls
+CASCADE_CUTOFF_STEP = 10
+_cascade_stats = {"rows": 0, "early_exits": 0}
+_cascade_stats_lock = threading.Lock()
 
 
-# ---------- Common regex patterns ----------
-POINTS_PAT = re.compile(r"\(\s*(\d+)\s*(pts|points?)\s*\)", re.IGNORECASE)
+def _count_cascade(rows: int, early_exits: int):
+    with _cascade_stats_lock:
+        _cascade_stats["rows"] += rows
+        _cascade_stats["early_exits"] += early_exits
+
+
+def cascade_stats() -> Dict:
+    """How many scored rows stopped before the last scorer, for this process."""
+    with _cascade_stats_lock:
+        stats = dict(_cascade_stats)
+    rows = stats["rows"]
+    stats["early_exit_rate"] = round(stats["early_exits"] / rows, 3) if rows else None
+    return stats
+
+
+def _cascade_certainty() -> Optional[int]:
+    """Configured early-exit score, or None when the cascade is switched off."""
+    return settings.DATASHEET_CASCADE_CERTAINTY if settings.DATASHEET_CASCADE else None
 
 
-# ---------- Fuzzy matching utilities ----------
 def _combined_best(query: str, choices: List[str], k=12):
     """Combine several scorers; keep the best score per choice index."""
-    res = []
-    for scorer in (
-        fuzz.WRatio,
-        fuzz.token_sort_ratio,
-        fuzz.token_set_ratio,
-        fuzz.partial_ratio,
-    ):
-        res.extend(process.extract(query, choices, scorer=scorer, limit=k))
-    best = {}
-    for name, score, idx in res:
-        if idx not in best or score > best[idx]["score"]:
-            best[idx] = {"name": name, "score": int(score), "idx": idx}
-    return sorted(best.values(), key=lambda x: x["score"], reverse=True)[:k]
+    if not choices:
+        return []
+    scores = _combined_score_matrix([query], choices, certainty=_cascade_certainty())
+    top, raw, first = (a[0] for a in _top_candidates(scores, k, [query], choices))
+    order = np.lexsort((top, -first, -raw))
+    return [
+        {"name": choices[top[j]], "score": int(raw[j]), "idx": int(top[j])}
+        for j in order
+    ]
+
+
+def _combined_score_matrix(
+    queries: List[str],
+    choices: List[str],
+    workers: Optional[int] = None,
+    certainty: Optional[int] = None,
+    max_bonus: int = 0,
+) -> np.ndarray:
+    """
+    Score every query against every choice with one `cdist` call per scorer.
+    Returns the float scores (scorers x queries x choices); the combined score is
+    `.max(axis=0)` truncated to int, and the float WRatio row breaks its ties
+    (see _top_candidates).
+
+    With `certainty` set, scoring cascades per query in CASCADE_ORDER (cheapest
+    first): each scorer gets `score_cutoff` = the query's best so far minus
+    `max_bonus` (rounded down to CASCADE_CUTOFF_STEP), so rapidfuzz prunes
+    candidates that can no longer win (they score 0). Once a query's best reaches
+    `certainty` it exits early: below 100 the remaining scorers are skipped; at 100
+    they only look for perfect ties, so the picked candidate is unchanged. Each
+    scorer still runs batched, one `cdist` per distinct cutoff over the rows left.
+    Pass the same queries/choices to `_top_candidates` so pruned tie-break scores
+    are filled in.
+    """
+    if workers is None:
+        workers = settings.FUZZY_MATCH_WORKERS
+    scores = np.zeros(
+        (len(COMBINED_SCORERS), len(queries), len(choices)), dtype=np.float64
+    )
+    if not queries or not choices:
+        return scores
+    if certainty is None:
+        for i, scorer in enumerate(COMBINED_SCORERS):
+            scores[i] = process.cdist(
+                queries, choices, scorer=scorer, dtype=np.float64, workers=workers
+            )
+        return scores
+
+    first, *rest = (COMBINED_SCORERS.index(scorer) for scorer in CASCADE_ORDER)
+    scores[first] = process.cdist(
+        queries, choices, scorer=COMBINED_SCORERS[first], dtype=np.float64, workers=workers
+    )
+    best = scores[first].max(axis=1)
+    active = np.ones(len(queries), dtype=bool)
+    certain = np.zeros(len(queries), dtype=bool)
+    for i in rest:
+        certain |= best >= certainty
+        if certainty < 100:
+            active &= ~certain
+        # once certain only perfect ties matter (for the tie-break)
+        cutoffs = np.where(
+            certain,
+            100,
+            np.maximum(0, best.astype(np.int64) - max_bonus)
+            // CASCADE_CUTOFF_STEP
+            * CASCADE_CUTOFF_STEP,
+        )
+        for cutoff in np.unique(cutoffs[active]):
+            rows = np.flatnonzero(active & (cutoffs == cutoff))
+            scores[i, rows] = process.cdist(
+                [queries[r] for r in rows],
+                choices,
+                scorer=COMBINED_SCORERS[i],
+                score_cutoff=int(cutoff),
+                dtype=np.float64,
+                workers=workers,
+            )
+        best = np.maximum(best, scores[i].max(axis=1))
+    _count_cascade(len(queries), int(certain.sum()))
+    return scores
+
+
+def _top_candidates(
+    scores: np.ndarray,
+    k: int = 12,
+    queries: Optional[List[str]] = None,
+    choices: Optional[List[str]] = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    For each row keep the top-`k` combined scores.
+    Returns (choice index, combined score truncated like int(score), first scorer
+    score as a float for tie-breaks), each rows x k, with indexes ascending so later
+    argmax ties resolve to the lowest index.
+    Given the queries/choices, first-scorer scores the cascade pruned to 0 are recomputed.
+    """
+    combined = scores.max(axis=0)
+    k = min(k, combined.shape[1])
+    top = np.argpartition(-combined, k - 1, axis=1)[:, :k]
+    top.sort(axis=1)
+    raw = np.take_along_axis(combined, top, axis=1).astype(np.int64)
+    first = np.take_along_axis(scores[0], top, axis=1)
+    if queries is not None:
+        for row, col in zip(*np.nonzero(first == 0)):
+            first[row, col] = COMBINED_SCORERS[0](queries[row], choices[top[row, col]])
+        raw = np.maximum(raw, first.astype(np.int64))
+    return top, raw, first
+
+
+def _pick_preferred(
+    top: np.ndarray, raw: np.ndarray, first: np.ndarray, bonus: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Add the per-choice `bonus` (indexed by choice) to the top candidates and pick
+    the highest adjusted score. Ties break by raw score, then by the first scorer
+    (WRatio), then by lowest index - the order `_combined_best` yields.
+    Returns (best choice index, best raw score) per row.
+    """
+    adj = raw + bonus[top]
+    # lexicographic (adjusted, raw, first scorer) as a single key; scores are <= 100
+    best_col = np.argmax((adj * 1000 + raw) * 1000 + first, axis=1)
+    rows = np.arange(top.shape[0])
+    return top[rows, best_col], raw[rows, best_col]
 
 
 # ---------- block parsing (no blank-line requirement) ----------
-def parse_datasheet_blocks(army_text: str) -> list[dict]:
+def iter_datasheet_blocks(army_text: str, lexed: Optional[Dict] = None) -> Iterator[dict]:
     """
     Split the army text into blocks where a block starts at any line that contains '(N points|pts)'
     and ends at the next empty line (or next datasheet line).
-    Skips lines with >= 1000 points (summary totals).
-    Returns: [{"header": <first line>, "entry_text": <full block as-is>}]
+    Skips lines with more points than any unit can cost (summary totals, see lex_army_list).
+    Yields each block as soon as it is complete:
+      {"header": <first line>, "entry_text": <full block as-is>, "query": <lookup string>}
     """
-    lines = army_text.splitlines()
-    blocks = []
+    lines = ensure_lexed(army_text, lexed)["lines"]
     i, n = 0, len(lines)
 
     while i < n:
         line = lines[i]
-        m = POINTS_PAT.search(line or "")
-        if m:
-            pts = int(m.group(1))
-            if pts >= 1000:  # skip "TOTAL ARMY POINTS" and similar
-                i += 1
-                continue
-
-            start = i
-            j = i + 1
-            while (
-                j < n
-                and not POINTS_PAT.search(lines[j] or "")
-                and lines[j].strip() != ""
-            ):
-                j += 1
-
-            block = "\n".join(lines[start:j])
-            header = line
-            blocks.append({"header": header, "entry_text": block})
-            i = j
-        else:
+        if not line["header"]:  # no points, or a "TOTAL ARMY POINTS" style summary
             i += 1
+            continue
+
+        j = i + 1
+        while j < n and lines[j]["points"] is None and not lines[j]["blank"]:
+            j += 1
 
-    return blocks
+        yield {
+            "header": line["raw"],
+            "entry_text": "\n".join(ln["raw"] for ln in lines[i:j]),
+            "query": line["query"],
+        }
+        i = j
+
+
+def parse_datasheet_blocks(army_text: str, lexed: Optional[Dict] = None) -> list[dict]:
+    """All blocks of `iter_datasheet_blocks` as a list."""
+    return list(iter_datasheet_blocks(army_text, lexed))
 
 
 # ---------- prefer-your-faction resolver ----------
+def _catalog_arrays(
+    catalog_all: List[Dict], snapshot: Optional[CatalogSnapshot]
+) -> tuple[List[str], np.ndarray]:
+    """Choice names and faction ids for `catalog_all` (precomputed if it is the snapshot's)."""
+    if snapshot is not None and snapshot.datasheets is catalog_all:
+        return snapshot.datasheet_names, snapshot.datasheet_faction_ids
+    names = [d.get("name_norm") or d["datasheet_name"] for d in catalog_all]
+    faction_ids = np.array([d.get("faction_id") or "" for d in catalog_all])
+    return names, faction_ids
+
+
+def _build_exact_name_index(catalog_all: List[Dict]) -> Dict[str, List[int]]:
+    """casefolded normalized name -> catalog indexes (duplicates across factions kept in order)."""
+    index: Dict[str, List[int]] = {}
+    for i, d in enumerate(catalog_all):
+        key = (d.get("name_norm") or _norm(d["datasheet_name"])).casefold()
+        index.setdefault(key, []).append(i)
+    return index
+
+
+def _exact_name_index(
+    catalog_all: List[Dict], snapshot: Optional[CatalogSnapshot]
+) -> Dict[str, List[int]]:
+    """Exact-name index for `catalog_all` (built once per snapshot if it is the snapshot's)."""
+    if snapshot is not None and snapshot.datasheets is catalog_all:
+        return snapshot.get_index(
+            "datasheet_exact_names", lambda snap: _build_exact_name_index(snap.datasheets)
+        )
+    return _build_exact_name_index(catalog_all)
+
+
+def _build_faction_rows(snapshot: CatalogSnapshot) -> Dict[str, np.ndarray]:
+    """faction_id -> positions of its datasheets in snapshot.datasheets (ascending)."""
+    rows: Dict[str, List[int]] = {}
+    for i, faction_id in enumerate(snapshot.datasheet_faction_ids):
+        rows.setdefault(faction_id, []).append(i)
+    return {faction_id: np.array(r) for faction_id, r in rows.items()}
+
+
+def _faction_rows(
+    faction_ids: Iterable[str],
+    catalog_all: List[Dict],
+    catalog_faction_ids: np.ndarray,
+    snapshot: Optional[CatalogSnapshot],
+) -> np.ndarray:
+    """Ascending catalog positions of the datasheets of `faction_ids`."""
+    if snapshot is not None and snapshot.datasheets is catalog_all:
+        by_faction = snapshot.get_index("datasheet_rows_by_faction", _build_faction_rows)
+        parts = [by_faction[f] for f in faction_ids if f in by_faction]
+        return np.sort(np.concatenate(parts)) if parts else np.array([], dtype=np.int64)
+    return np.flatnonzero(np.isin(catalog_faction_ids, list(faction_ids)))
+
+
+def _set_resolution(entry: Dict, datasheet_id, datasheet_name, method: str):
+    if datasheet_id is not None:
+        entry["datasheet_id"] = datasheet_id
+        entry["datasheet_name"] = datasheet_name
+    entry["method"] = method
+
+
+# ---------- cross-request header memo ----------
+def _memo_weight(key: tuple, value: tuple) -> int:
+    """Rough size in bytes of a memo entry (strings dominate)."""
+    strings = [key[-2], *key[-1], *(v for v in value if isinstance(v, str))]
+    return 200 + sum(len(x) for x in strings)
+
+
+# (generation, hi, lo, prefer_bonus, k, query, preferred faction ids) ->
+#   (datasheet_id, datasheet_name, method); only non-exact resolutions are stored
+_header_memo = LRUCache(settings.DATASHEET_MEMO_MAX_BYTES, weigh=_memo_weight)
+
+
+def _pick_exact(candidates: List[int], faction_ids: np.ndarray, preferred: set) -> int:
+    """First candidate from a preferred faction, else the first one."""
+    for idx in candidates:
+        if faction_ids[idx] in preferred:
+            return idx
+    return candidates[0]
+
+
+def resolve_block_groups_to_datasheets_prefer(
+    groups: List[Tuple[List[Dict], Iterable[str]]],  # [(blocks, preferred_faction_ids)]
+    catalog_all: List[Dict],
+    hi: int = 92,
+    lo: int = 70,
+    prefer_bonus: int = 8,
+    k: int = 12,
+    snapshot: Optional[CatalogSnapshot] = None,
+) -> List[List[Dict]]:
+    """
+    Resolve the blocks of several lists in one matching pass:
+      - derive a query from each header line
+      - resolve exact (casefolded) datasheet names from a hash index; among
+        duplicate names prefer the group's factions
+      - reuse resolutions remembered from earlier requests (see _header_memo)
+      - retry the rest after per-token typo correction (edit distance <= 2)
+      - fuzzy match the rest against the group's preferred factions' datasheets
+        first; keep hits with a RAW score >= hi (see shortlist_min)
+      - fuzzy match what is left against ALL datasheets (all factions) in one matrix pass
+      - per group, break ties/ambiguity by adding `prefer_bonus` to candidates
+        from that group's preferred factions
+      - accept only if RAW score >= lo (use adjusted score only for tie-breaking)
+    Returns one list of {datasheet_id, datasheet_name, entry_text, method} per group,
+    where method is 'exact', 'corrected', 'fuzzy' or 'none'.
+    """
+    names, faction_ids = _catalog_arrays(catalog_all, snapshot)
+    exact_index = _exact_name_index(catalog_all, snapshot)
+    group_queries = [
+        [b.get("query") or _header_to_query(b["header"]) for b in blocks]
+        for blocks, _ in groups
+    ]
+
+    outs = [
+        [
+            {
+                "datasheet_id": None,
+                "datasheet_name": query,
+                "entry_text": b["entry_text"],
+                "method": "none",
+            }
+            for b, query in zip(blocks, queries)
+        ]
+        for (blocks, _), queries in zip(groups, group_queries)
+    ]
+
+    group_keys = [tuple(sorted(set(pref or []))) for _, pref in groups]
+    memo_prefix = None
+    if snapshot is not None and snapshot.datasheets is catalog_all:
+        memo_prefix = (snapshot.generation, hi, lo, prefer_bonus, k)
+
+    # exact-name fast path, then resolutions remembered from earlier requests
+    pending_rows = []
+    for key, queries, out in zip(group_keys, group_queries, outs):
+        preferred = set(key)
+        rest = []
+        for row, query in enumerate(queries):
+            candidates = exact_index.get(query.casefold())
+            if candidates:
+                ds = catalog_all[_pick_exact(candidates, faction_ids, preferred)]
+                _set_resolution(out[row], ds["datasheet_id"], ds["datasheet_name"], "exact")
+                continue
+            memo_hit = None
+            if memo_prefix is not None:
+                memo_hit = _header_memo.get((*memo_prefix, query, key))
+            if memo_hit is not None:
+                _set_resolution(out[row], *memo_hit)
+            else:
+                rest.append(row)
+        pending_rows.append(rest)
+
+    if any(pending_rows):
+        _resolve_pending(
+            group_keys, group_queries, pending_rows, outs, catalog_all, names,
+            faction_ids, exact_index, hi, lo, prefer_bonus, k, snapshot,
+        )
+        if memo_prefix is not None:
+            for key, queries, rest, out in zip(group_keys, group_queries, pending_rows, outs):
+                for row in rest:
+                    o = out[row]
+                    _header_memo.set(
+                        (*memo_prefix, queries[row], key),
+                        (o["datasheet_id"], o["datasheet_name"], o["method"]),
+                    )
+    return outs
+
+
+def _resolve_pending(
+    group_keys: List[tuple],
+    group_queries: List[List[str]],
+    pending_rows: List[List[int]],
+    outs: List[List[Dict]],
+    catalog_all: List[Dict],
+    names: List[str],
+    faction_ids: np.ndarray,
+    exact_index: Dict[str, List[int]],
+    hi: int,
+    lo: int,
+    prefer_bonus: int,
+    k: int,
+    snapshot: Optional[CatalogSnapshot],
+):
+    """
+    Resolve `pending_rows` of each group in place: typo correction, then the
+    preferred-faction shortlist, then the global catalog.
+    """
+    # headers with typos are corrected token-wise and retried against the exact index
+    if snapshot is not None and snapshot.datasheets is catalog_all:
+        typo_index = get_typo_index(snapshot)
+        corrected = {}
+        for q in dict.fromkeys(
+            queries[r] for queries, rest in zip(group_queries, pending_rows) for r in rest
+        ):
+            fixed = correct_query(q.casefold(), typo_index)
+            if fixed is not None and fixed in exact_index:
+                corrected[q] = fixed
+        remaining = []
+        for key, queries, rest, out in zip(group_keys, group_queries, pending_rows, outs):
+            left = []
+            for row in rest:
+                if queries[row] in corrected:
+                    candidates = exact_index[corrected[queries[row]]]
+                    ds = catalog_all[_pick_exact(candidates, faction_ids, set(key))]
+                    _set_resolution(out[row], ds["datasheet_id"], ds["datasheet_name"], "corrected")
+                else:
+                    left.append(row)
+            remaining.append(left)
+        pending_rows = remaining
+
+    # only headers the indexes could not resolve reach the fuzzy scorers
+    if not names or not any(pending_rows):
+        return
+
+    def accept(out, row, idx):
+        ds = catalog_all[idx]
+        _set_resolution(out[row], ds["datasheet_id"], ds["datasheet_name"], "fuzzy")
+
+    # shortlist: score against the preferred factions' datasheets only. A hit is kept
+    # if it reaches `hi` and no other faction could still win after the bonus.
+    shortlist_min = max(hi, 101 - prefer_bonus)
+    shortlist_queries: Dict[tuple, Dict[str, None]] = {}
+    for key, queries, pending in zip(group_keys, group_queries, pending_rows):
+        if key and pending:
+            shortlist_queries.setdefault(key, {}).update(dict.fromkeys(queries[r] for r in pending))
+
+    certainty = _cascade_certainty()
+    shortlist_hits: Dict[Tuple[tuple, str], int] = {}
+    for key, queries in shortlist_queries.items():
+        rows = _faction_rows(key, catalog_all, faction_ids, snapshot)
+        if not len(rows):
+            continue
+        queries = list(queries)
+        shortlist_names = [names[i] for i in rows]
+        top, raw, first = _top_candidates(
+            _combined_score_matrix(queries, shortlist_names, certainty=certainty),
+            k,
+            queries,
+            shortlist_names,
+        )
+        best_col, best_raw = _pick_preferred(top, raw, first, np.zeros(len(rows), dtype=np.int64))
+        for query, col, score in zip(queries, best_col, best_raw):
+            if score >= shortlist_min:
+                shortlist_hits[(key, query)] = rows[col]
+
+    fallback_rows = []
+    for key, queries, pending, out in zip(group_keys, group_queries, pending_rows, outs):
+        rest = []
+        for row in pending:
+            idx = shortlist_hits.get((key, queries[row]))
+            if idx is None:
+                rest.append(row)
+            else:
+                accept(out, row, idx)
+        fallback_rows.append(rest)
+
+    # global fallback: everything the shortlist could not settle, against ALL datasheets
+    unique = list(
+        dict.fromkeys(
+            queries[r] for queries, rest in zip(group_queries, fallback_rows) for r in rest
+        )
+    )
+    if not unique:
+        return
+
+    # preferred candidates left for this pass score below shortlist_min; a row may
+    # only stop early at a score their bonus cannot reach
+    max_bonus = 0
+    if any(key for key, rest in zip(group_keys, fallback_rows) if rest):
+        max_bonus = prefer_bonus
+        if certainty is not None:
+            certainty = max(certainty, shortlist_min - 1 + prefer_bonus)
+
+    row_of = {q: i for i, q in enumerate(unique)}
+    top, raw, first = _top_candidates(
+        _combined_score_matrix(unique, names, certainty=certainty, max_bonus=max_bonus),
+        k,
+        unique,
+        names,
+    )
+
+    for key, queries, rest, out in zip(group_keys, group_queries, fallback_rows, outs):
+        if not rest:
+            continue
+        rows = np.array([row_of[queries[row]] for row in rest])
+        pref = np.array(list(key), dtype=faction_ids.dtype)
+        bonus = np.where(np.isin(faction_ids, pref), prefer_bonus, 0)
+        best_idx, best_raw = _pick_preferred(top[rows], raw[rows], first[rows], bonus)
+
+        for row, idx, score in zip(rest, best_idx, best_raw):
+            # require a minimum RAW score (not adjusted) to accept
+            if score >= lo:
+                accept(out, row, idx)
+
+
 def resolve_blocks_to_datasheets_prefer(
     blocks: List[Dict],
     catalog_all: List[
@@ -101,74 +527,25 @@ def resolve_blocks_to_datasheets_prefer(
     lo: int = 70,
     prefer_bonus: int = 8,  # bias toward preferred factions
     k: int = 12,
+    snapshot: Optional[CatalogSnapshot] = None,  # precomputed arrays for catalog_all
 ) -> List[Dict]:
     """
-    For each block:
-      - derive a query from the header line
-      - fuzzy match against ALL datasheets (all factions)
+    For all blocks at once (see resolve_block_groups_to_datasheets_prefer):
+      - derive a query from each header line
+      - fuzzy match every query against ALL datasheets (all factions) in one matrix pass
       - break ties/ambiguity by adding `prefer_bonus` to candidates from preferred factions
       - accept only if RAW score >= lo (use adjusted score only for tie-breaking)
-      - return {datasheet_id, datasheet_name, entry_text}
-    """
-    pref_set = set(preferred_faction_ids or [])
-    names = [d["datasheet_name"] for d in catalog_all]
-    out = []
-
-    for b in blocks:
-        header = b["header"]
-        entry_text = b["entry_text"]
-        query = _header_to_query(header)
-
-        top = _combined_best(query, names, k=k)
-        if not top:
-            out.append(
-                {
-                    "datasheet_id": None,
-                    "datasheet_name": query,
-                    "entry_text": entry_text,
-                }
-            )
-            continue
-
-        # compute adjusted scores (bonus for preferred factions)
-        ranked = []
-        for cand in top:
-            item = catalog_all[cand["idx"]]
-            raw = cand["score"]
-            bonus = prefer_bonus if item.get("faction_id") in pref_set else 0
-            ranked.append(
-                {
-                    "raw_score": raw,
-                    "adj_score": raw + bonus,
-                    "idx": cand["idx"],
-                    "item": item,
-                }
-            )
-
-        # pick the candidate with highest adjusted score (tie-break by raw)
-        ranked.sort(key=lambda r: (r["adj_score"], r["raw_score"]), reverse=True)
-        best = ranked[0]
-
-        # require a minimum RAW score (not adjusted) to accept
-        if best["raw_score"] < lo:
-            out.append(
-                {
-                    "datasheet_id": None,
-                    "datasheet_name": query,
-                    "entry_text": entry_text,
-                }
-            )
-        else:
-            ds = best["item"]
-            out.append(
-                {
-                    "datasheet_id": ds["datasheet_id"],
-                    "datasheet_name": ds["datasheet_name"],
-                    "entry_text": entry_text,
-                }
-            )
-
-    return out
+      - return {datasheet_id, datasheet_name, entry_text, method}
+    """
+    return resolve_block_groups_to_datasheets_prefer(
+        [(blocks, preferred_faction_ids)],
+        catalog_all,
+        hi=hi,
+        lo=lo,
+        prefer_bonus=prefer_bonus,
+        k=k,
+        snapshot=snapshot,
+    )[0]
 
 
 # ---------- convenience wrapper ----------
@@ -180,8 +557,10 @@ def extract_datasheet_entries_prefer(
     lo: int = 70,
     prefer_bonus: int = 8,
     k: int = 12,
+    snapshot: Optional[CatalogSnapshot] = None,
+    lexed: Optional[Dict] = None,
 ) -> List[Dict]:
-    blocks = parse_datasheet_blocks(army_text)
+    blocks = parse_datasheet_blocks(army_text, lexed)
     return resolve_blocks_to_datasheets_prefer(
         blocks,
         catalog_all,
@@ -190,32 +569,23 @@ def extract_datasheet_entries_prefer(
         lo=lo,
         prefer_bonus=prefer_bonus,
         k=k,
+        snapshot=snapshot,
     )
 
 
-# ---------- helper to build a master catalog from database ----------
-def build_master_catalog() -> List[Dict]:
+# ---------- helper to build a master catalog from the snapshot ----------
+def build_master_catalog(snapshot: Optional[CatalogSnapshot] = None) -> List[Dict]:
     """
     Returns a flat list:
-      [{"datasheet_name","datasheet_id","faction_id","faction_name","is_supplement"}, ...]
-    """
-    factions = FactionJson.objects.all()
-    master = []
-    for faction in factions:
-        faction_data = faction.data
-        for ds in faction_data.get("datasheets", []):
-            master.append(
-                {
-                    "datasheet_name": ds["datasheet_name"],
-                    "datasheet_id": ds["datasheet_id"],
-                    "faction_id": faction_data["faction_id"],
-                }
-            )
-    return master
+      [{"datasheet_name","datasheet_id","faction_id","name_norm"}, ...]
+    """
+    snapshot = snapshot or get_catalog_snapshot()
+    return snapshot.datasheets
 
 
-def detect_datasheets(army_list, faction_ids):
-    catalog_all = build_master_catalog()
+def detect_datasheets(army_list, faction_ids, snapshot=None, lexed=None):
+    snapshot = snapshot or get_catalog_snapshot()
+    catalog_all = build_master_catalog(snapshot)
 
     entries = extract_datasheet_entries_prefer(
         army_text=army_list,
@@ -224,6 +594,8 @@ def detect_datasheets(army_list, faction_ids):
         hi=92,
         lo=70,
         prefer_bonus=8,
+        snapshot=snapshot,
+        lexed=lexed,
     )
 
     return entries
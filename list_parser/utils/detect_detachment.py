@@ -1,37 +1,128 @@
-from typing import Dict, List
+import re
+import time
+from typing import Dict, Iterable, List, Optional
 
-from datasheet_scraper.models import FactionJson, DetachmentJson
+import numpy as np
+from django.conf import settings
+
+from list_parser.utils.catalog import CatalogSnapshot, get_catalog_snapshot
+from list_parser.utils.lexer import ensure_lexed
 from list_parser.utils.shared_utils import _norm
 
-from rapidfuzz import fuzz
+from rapidfuzz import fuzz, process
 
 
-def get_detachments_for_faction(faction_id: str) -> List[Dict]:
-    factions = FactionJson.objects.all()
-    fac = next((f for f in factions if f.faction_id == faction_id), None)
-    if not fac:
-        raise ValueError(f"Faction id '{faction_id}' not found in factions json")
-    return fac.data.get("detachments", [])
+def get_detachments_for_faction(
+    faction_id: str, snapshot: Optional[CatalogSnapshot] = None
+) -> List[Dict]:
+    snapshot = snapshot or get_catalog_snapshot()
+    return snapshot.detachments_for_faction(faction_id)
 
 
 # ---------- candidate line builder (no filtering) ----------
-def _candidate_lines(army_text: str, max_lines: int = 20) -> List[str]:
+def _candidate_lines(
+    army_text: str, max_lines: int = 20, lexed: Optional[Dict] = None
+) -> List[str]:
     """
     Use ALL non-empty normalized lines from the first `max_lines`,
     plus adjacent bigrams (line i + line i+1).
     """
-    lines = [_norm(ln) for ln in army_text.splitlines()[:max_lines]]
+    lines = [ln["norm"] for ln in ensure_lexed(army_text, lexed)["lines"][:max_lines]]
     cands = [ln for ln in lines if ln]  # keep non-empty
     bigrams = [f"{a} {b}" for a, b in zip(cands, cands[1:])]
     return cands + bigrams
 
 
 # ---------- main finder ----------
+DETACHMENT_SCORERS = (fuzz.WRatio, fuzz.token_set_ratio, fuzz.partial_ratio)
+
+
+def _no_detachment(timing: Dict) -> Dict:
+    return {
+        "detachment_id": None,
+        "detachment_name": None,
+        "score": None,
+        "method": "none",
+        "timing": timing,
+    }
+
+
+def find_detachments_for_factions(
+    army_text: str,
+    faction_ids: Iterable[str],
+    lo: int = 70,
+    max_lines: int = 20,
+    snapshot: Optional[CatalogSnapshot] = None,
+    lexed: Optional[Dict] = None,
+) -> Dict[str, Dict]:
+    """
+    Score the candidate lines against the detachments of ALL given factions in
+    one matrix pass (one `cdist` per scorer), then reduce to the best match per faction.
+    Returns {faction_id: <find_detachment_for_list result>}.
+    """
+    snapshot = snapshot or get_catalog_snapshot()
+    t0 = time.perf_counter()
+    faction_ids = list(dict.fromkeys(faction_ids))
+    detachments, spans = [], {}
+    for faction_id in faction_ids:
+        dets = get_detachments_for_faction(faction_id, snapshot)
+        spans[faction_id] = (len(detachments), len(detachments) + len(dets))
+        detachments.extend(dets)
+
+    cands = [c.lower() for c in _candidate_lines(army_text, max_lines=max_lines, lexed=lexed)]
+    names = [d["name_norm"].lower() for d in detachments]
+    t1 = time.perf_counter()
+
+    # names x candidates, best score across scorers
+    scores = np.zeros((len(names), len(cands)), dtype=np.int32)
+    if names and cands:
+        workers = settings.FUZZY_MATCH_WORKERS
+        for scorer in DETACHMENT_SCORERS:
+            np.maximum(
+                scores,
+                process.cdist(
+                    names, cands, scorer=scorer, dtype=np.float64, workers=workers
+                ).astype(np.int32),
+                out=scores,
+            )
+    t2 = time.perf_counter()
+
+    timing = {
+        "candidates_ms": round((t1 - t0) * 1000, 2),
+        "scoring_ms": round((t2 - t1) * 1000, 2),
+        "factions": len(faction_ids),
+    }
+    results = {}
+    for faction_id in faction_ids:
+        start, stop = spans[faction_id]
+        if start == stop or not cands:
+            results[faction_id] = _no_detachment(timing)
+            continue
+        # candidate-major order, so ties go to the earliest line like the old loop
+        block = scores[start:stop].T
+        cand_idx, name_idx = np.unravel_index(np.argmax(block), block.shape)
+        best_score = int(block[cand_idx, name_idx])
+        if best_score < lo:
+            results[faction_id] = _no_detachment(timing)
+            continue
+        d = detachments[start + name_idx]
+        results[faction_id] = {
+            "detachment_id": d["detachment_id"],
+            "detachment_name": d["detachment_name"],
+            "score": best_score,
+            "method": "fuzzy",
+            "timing": timing,
+        }
+    return results
+
+
 def find_detachment_for_list(
     army_text: str,
     faction_id: str,
     lo: int = 70,
     max_lines: int = 20,
+    snapshot: Optional[CatalogSnapshot] = None,
+    lexed: Optional[Dict] = None,
 ) -> Dict:
     """
     Returns the single best detachment found in the first `max_lines` lines:
@@ -39,63 +130,58 @@ def find_detachment_for_list(
       'detachment_id': str|None,
       'detachment_name': str|None,
       'score': int|None,
-      'method': 'fuzzy'|'none'
+      'method': 'fuzzy'|'none',
+      'timing': {'candidates_ms', 'scoring_ms', 'factions'}
     }
     """
-    detachments = get_detachments_for_faction(faction_id)
-    if not detachments:
-        return {
-            "detachment_id": None,
-            "detachment_name": None,
-            "score": None,
-            "method": "none",
-        }
+    return find_detachments_for_factions(
+        army_text, [faction_id], lo=lo, max_lines=max_lines, snapshot=snapshot, lexed=lexed
+    )[faction_id]
 
-    names = [_norm(d["detachment_name"]) for d in detachments]
-    cands = _candidate_lines(army_text, max_lines=max_lines)
-    if not cands:
-        return {
-            "detachment_id": None,
-            "detachment_name": None,
-            "score": None,
-            "method": "none",
-        }
 
-    best_idx, best_score = None, -1
-    for cand in cands:
-        cl = cand.lower()
-        for i, det_name in enumerate(names):
-            dn = det_name.lower()
-            score = max(
-                int(fuzz.WRatio(dn, cl)),
-                int(fuzz.token_set_ratio(dn, cl)),
-                int(fuzz.partial_ratio(dn, cl)),
-            )
-            if score > best_score:
-                best_score = score
-                best_idx = i
+def get_enhancement_names_for_detachment(
+    detachment_id: str, snapshot: Optional[CatalogSnapshot] = None
+) -> List[str]:
+    snapshot = snapshot or get_catalog_snapshot()
+    return snapshot.enhancement_names_for_detachment(detachment_id)
 
-    if best_idx is not None and best_score >= lo:
-        d = detachments[best_idx]
 
-        return {
-            "detachment_id": d["detachment_id"],
-            "detachment_name": d["detachment_name"],
-            "score": int(best_score),
-            "method": "fuzzy",
+# ---------- per-unit enhancements ----------
+def _build_enhancement_matchers(snapshot: CatalogSnapshot) -> Dict[str, Dict]:
+    """
+    detachment_id -> {"pattern", "names"}: the detachment's normalized enhancement
+    names compiled into one alternation regex, longest first so a name that
+    contains a shorter one wins, plus casefolded name -> catalog name.
+    """
+    matchers = {}
+    for detachment_id, enhancement_names in snapshot.enhancements_by_detachment.items():
+        names = {}
+        for name in enhancement_names:
+            key = _norm(name).casefold()
+            if key:
+                names.setdefault(key, name)
+        if not names:
+            continue
+        alternation = "|".join(re.escape(n) for n in sorted(names, key=len, reverse=True))
+        # lookarounds rather than \b: names may start or end with punctuation
+        matchers[detachment_id] = {
+            "pattern": re.compile(rf"(?<!\w)(?:{alternation})(?!\w)"),
+            "names": names,
         }
+    return matchers
 
-    return {
-        "detachment_id": None,
-        "detachment_name": None,
-        "score": None,
-        "method": "none",
-    }
 
-def get_enhancement_names_for_detachment(detachment_id: str) -> List[str]:
-    detachment = DetachmentJson.objects.get(detachment_id=detachment_id)
-    if not detachment:
-        return []
-    enhancements = detachment.data.get("enhancements", [])
-    enhancement_names = [e["name"] for e in enhancements if "name" in e]
-    return enhancement_names
+def find_unit_enhancement(
+    entry_text: str, detachment_id: Optional[str], snapshot: Optional[CatalogSnapshot] = None
+) -> Optional[str]:
+    """The first of the detachment's enhancements named in a unit's entry text, or None."""
+    if not detachment_id or not entry_text:
+        return None
+    snapshot = snapshot or get_catalog_snapshot()
+    matcher = snapshot.get_index("enhancement_matchers", _build_enhancement_matchers).get(
+        detachment_id
+    )
+    if matcher is None:
+        return None
+    m = matcher["pattern"].search(_norm(entry_text).casefold())
+    return matcher["names"][m.group(0)] if m else None
@@ -1,10 +1,17 @@
 import re
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+import numpy as np
 from rapidfuzz import process, fuzz
 
-from datasheet_scraper.models import FactionJson
+from list_parser.utils.catalog import CatalogSnapshot, get_catalog_snapshot
+from list_parser.utils.lexer import ensure_lexed
 from list_parser.utils.shared_utils import _norm
+from list_parser.utils.typo_index import correct_query, get_typo_index
+
 
+# How many resolvable unit headers vote when the list never names its faction
+FACTION_VOTE_HEADERS = 5
 
 # Faction name aliases: canonical_name -> list of aliases
 FACTION_ALIASES: Dict[str, List[str]] = {
@@ -13,31 +20,10 @@ FACTION_ALIASES: Dict[str, List[str]] = {
 }
 
 
-def _strip_faction_prefix(faction_name: str) -> tuple[str, bool]:
-    """Remove codex prefixes and detect if it's a supplement."""
-    is_supplement = faction_name.lower().startswith("codex supplement:")
-    clean_name = re.sub(r"^codex supplement:\s*", "", faction_name, flags=re.I)
-    clean_name = re.sub(r"^codex:\s*", "", clean_name, flags=re.I)
-    clean_name = re.sub(r"^index:\s*", "", clean_name, flags=re.I)
-    return _norm(clean_name), is_supplement
-
-
-def load_factions():
-    """Load factions from the database into a simplified list."""
-    factions = FactionJson.objects.all()
-    possible_factions = []
-    for faction in factions:
-        faction_data = faction.data
-        name, is_supplement = _strip_faction_prefix(faction_data["faction"])
-        possible_factions.append(
-            {
-                "faction_name": name,
-                "faction_id": faction_data["faction_id"],
-                "is_supplement": is_supplement,
-            }
-        )
-
-    return possible_factions
+def load_factions(snapshot: Optional[CatalogSnapshot] = None):
+    """Load factions from the catalog snapshot into a simplified list."""
+    snapshot = snapshot or get_catalog_snapshot()
+    return [dict(f) for f in snapshot.factions]
 
 
 def expand_factions_with_aliases(factions: list) -> list:
@@ -55,59 +41,180 @@ def expand_factions_with_aliases(factions: list) -> list:
     return expanded
 
 
-def detect_factions(army_text: str, threshold: int = 80) -> list:
+# ---------- compiled exact-name matcher (built once per catalog generation) ----------
+def _build_faction_matcher(snapshot: CatalogSnapshot) -> Dict:
+    """
+    Compile every normalized faction name and alias into ONE alternation regex,
+    longest names first, so a single left-to-right scan finds all exact hits and
+    an overlapping shorter name ('Space Marines' inside 'Chaos Space Marines')
+    is consumed by the longer one.
+    """
+    # the search keys sit in lists parallel to `expanded`, so the faction dicts
+    # handed back to callers carry only catalog fields
+    expanded, search_names, name_lens, is_alias = [], [], [], []
+    for faction in expand_factions_with_aliases(load_factions(snapshot)):
+        search_name = faction.pop("_search_name")
+        search_norm = _norm(search_name)
+        expanded.append(faction)
+        search_names.append(search_norm.lower())
+        name_lens.append(len(search_norm))
+        is_alias.append(search_name != faction["faction_name"])
+
+    entries_by_name: Dict[str, List[int]] = {}
+    for i, search_lc in enumerate(search_names):
+        entries_by_name.setdefault(search_lc, []).append(i)
+
+    alternation = "|".join(
+        re.escape(n) for n in sorted(entries_by_name, key=len, reverse=True) if n
+    )
+    pattern = re.compile(rf"\b(?:{alternation})\b") if alternation else None
+
+    # faction name -> other faction names that contain it (for overlap suppression)
+    names = {f["faction_name"].lower() for f in expanded}
+    contained_by = {n: {m for m in names if n != m and n in m} for n in names}
+
+    return {
+        "expanded": expanded,
+        "search_names": search_names,
+        "name_lens": name_lens,
+        "is_alias": is_alias,
+        "entries_by_name": entries_by_name,
+        "pattern": pattern,
+        "contained_by": contained_by,
+    }
+
+
+def _ranked(hits: list, matcher: Dict) -> list:
+    """
+    Sort (expanded index, faction) hits by score, then longer matched name, then
+    faction name, and drop the indices.
+    """
+    name_lens = matcher["name_lens"]
+    return [
+        faction for _, faction in sorted(
+            hits, key=lambda h: (-h[1]["score"], -name_lens[h[0]], h[1]["faction_name"])
+        )
+    ]
+
+
+def suppress_overlaps(hits: list, contained_by: Dict[str, set]) -> list:
+    """Drop any faction whose name is a substring of a longer matched name."""
+    matched = {h["faction_name"].lower() for h in hits}
+    return [
+        h for h in hits if not (contained_by[h["faction_name"].lower()] & matched)
+    ]
+
+
+# ---------- datasheet -> factions inverted index ----------
+def _build_datasheet_factions(snapshot: CatalogSnapshot) -> Dict[str, List[str]]:
+    """casefolded datasheet name -> ids of the factions that field it (catalog order)."""
+    index: Dict[str, List[str]] = {}
+    for ds in snapshot.datasheets:
+        faction_ids = index.setdefault(ds["name_norm"].casefold(), [])
+        if ds["faction_id"] not in faction_ids:
+            faction_ids.append(ds["faction_id"])
+    return index
+
+
+def vote_factions_from_datasheets(
+    lexed: Dict, snapshot: CatalogSnapshot, max_headers: int = FACTION_VOTE_HEADERS
+) -> list:
+    """
+    Infer factions from the units: look up the first `max_headers` unit headers
+    that name a datasheet exactly (or after typo correction) in the
+    datasheet -> factions index; each header votes for every faction fielding it.
+    Returns the faction(s) with the most votes, scored by vote share, as
+    (expanded index, faction) pairs, if they were backed by at least two headers
+    (or the only one).
+    """
+    index = snapshot.get_index("datasheet_factions", _build_datasheet_factions)
+    typo_index = get_typo_index(snapshot)
+
+    votes: Dict[str, int] = {}
+    headers = 0
+    for line in lexed["lines"]:
+        if headers >= max_headers:
+            break
+        if not line["header"]:
+            continue
+        key = line["query"].casefold()
+        if key not in index:
+            key = correct_query(key, typo_index)
+            if key not in index:
+                continue
+        headers += 1
+        for faction_id in index[key]:
+            votes[faction_id] = votes.get(faction_id, 0) + 1
+
+    if not votes:
+        return []
+    best = max(votes.values())
+    if best < min(2, headers):
+        return []
+
+    matcher = snapshot.get_index("faction_matcher", _build_faction_matcher)
+    return [
+        (i, {**faction, "score": round(100 * best / headers, 1)})
+        for i, faction in enumerate(matcher["expanded"])
+        if votes.get(faction["faction_id"]) == best and not matcher["is_alias"][i]
+    ]
+
+
+def detect_factions(
+    army_text: str,
+    threshold: int = 80,
+    snapshot: Optional[CatalogSnapshot] = None,
+    lexed: Optional[Dict] = None,
+) -> list:
     """
     Detect faction(s) from army list text.
-    - Pass 1: exact phrase matches (word boundaries)
+    - Pass 1: exact phrase matches (word boundaries), one scan with the compiled matcher
     - Suppress overlaps: if 'Space Marines' and 'Chaos Space Marines' both match, keep the longer name.
-    - Pass 2: fuzzy fallback only for factions not already matched.
+    - Pass 2: no faction named - let the first resolvable unit headers vote
+      (see vote_factions_from_datasheets).
+    - Pass 3: fuzzy fallback over the text, only if no unit could be looked up either.
     Returns sorted list of {faction_name, faction_id, is_supplement, score}.
     """
-    text_norm = _norm(army_text)
-    text_lc = text_norm.lower()
+    snapshot = snapshot or get_catalog_snapshot()
+    matcher = snapshot.get_index("faction_matcher", _build_faction_matcher)
+    expanded_factions = matcher["expanded"]
 
-    possible_factions = load_factions()
-    expanded_factions = expand_factions_with_aliases(possible_factions)
+    lexed = ensure_lexed(army_text, lexed)
+    text_lc = lexed["text_norm"].lower()
 
     # ----- Pass 1: exact phrase matches with word boundaries
-    exact_hits = []
-    for faction in expanded_factions:
-        fname = _norm(faction["_search_name"])
-        fname_lc = re.escape(fname.lower())
-        # \b ensures token boundaries; handles multi-word phrases
-        if re.search(rf"\b{fname_lc}\b", text_lc):
-            exact_hits.append({**faction, "score": 100, "_len": len(fname)})
-
-    # Suppress overlaps: drop any faction whose name is a substring of a longer matched name
-    def suppress_overlaps(hits):
-        keep = []
-        names = [h["faction_name"].lower() for h in hits]
-        for h in hits:
-            n = h["faction_name"].lower()
-            # if any OTHER matched name contains this name (as substring), prefer the longer one
-            if any((n != m and n in m) for m in names):
-                # only drop if the longer container exists
-                continue
-            keep.append(h)
-        return keep
-
-    exact_hits = suppress_overlaps(exact_hits)
+    hit_idx = set()
+    if matcher["pattern"] is not None:
+        for m in matcher["pattern"].finditer(text_lc):
+            hit_idx.update(matcher["entries_by_name"][m.group(0)])
+    exact_hits = [
+        (i, {**expanded_factions[i], "score": 100}) for i in sorted(hit_idx)
+    ]
+    exact_hits = suppress_overlaps(_ranked(exact_hits, matcher), matcher["contained_by"])
 
     # If we got any exact hits after suppression, we're done (most precise)
     if exact_hits:
-        return sorted(
-            exact_hits, key=lambda x: (-x["score"], -x["_len"], x["faction_name"])
-        )
-
-    # ----- Pass 2: fuzzy fallback (no exact phrases found)
-    results = []
-    full_text_list = [text_lc]  # RapidFuzz expects an iterable of choices
-    for faction in expanded_factions:
-        fname = _norm(faction["_search_name"]).lower()
-        match = process.extractOne(fname, full_text_list, scorer=fuzz.partial_ratio)
-        if match and match[1] >= threshold:
-            results.append({**faction, "score": match[1], "_len": len(fname)})
+        return exact_hits
+
+    # ----- Pass 2: infer from the units (index lookups only)
+    voted = vote_factions_from_datasheets(lexed, snapshot)
+    if voted:
+        return _ranked(voted, matcher)
+
+    # ----- Pass 3: fuzzy fallback (no exact phrases, no recognisable units)
+    # one batched call over all names; score_cutoff lets rapidfuzz skip hopeless ones
+    scores = process.cdist(
+        [text_lc],
+        matcher["search_names"],
+        scorer=fuzz.partial_ratio,
+        score_cutoff=threshold,
+        dtype=np.float64,
+        workers=1,  # a single query is faster without threads
+    )[0]
+    results = [
+        (i, {**expanded_factions[i], "score": float(scores[i])})
+        for i in np.flatnonzero(scores >= threshold)
+    ]
 
     # Do the same overlap suppression among fuzzy results
-    results = suppress_overlaps(results)
-    return sorted(results, key=lambda x: (-x["score"], -x["_len"], x["faction_name"]))
+    return suppress_overlaps(_ranked(results, matcher), matcher["contained_by"])
@@ -0,0 +1,110 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from rapidfuzz import fuzz, process
+
+from list_parser.utils.catalog import CatalogSnapshot, get_catalog_snapshot
+from list_parser.utils.lexer import BULLET_PAT, COUNT_PAT
+from list_parser.utils.shared_utils import _norm
+
+WEAPON_SCORER = fuzz.ratio
+WEAPON_MIN_SCORE = 85
+
+# 'Plasma incinerator - supercharge' -> 'Plasma incinerator' (lists name the weapon, not the profile)
+PROFILE_SUFFIX_PAT = re.compile(r"\s+-\s+.*$")
+
+
+# ---------- index ----------
+def _build_weapon_index(snapshot: CatalogSnapshot) -> Dict[str, Tuple[List[str], List[str]]]:
+    """
+    datasheet_id -> (weapon names, casefolded lookup keys): the datasheet's ranged
+    and melee weapons with profile suffixes dropped, one entry per weapon.
+    """
+    index = {}
+    for datasheet_id, weapon_names in snapshot.weapons_by_datasheet.items():
+        by_key: Dict[str, str] = {}
+        for name in weapon_names:
+            base = PROFILE_SUFFIX_PAT.sub("", _norm(name))
+            if base:
+                by_key.setdefault(base.casefold(), base)
+        if by_key:
+            index[datasheet_id] = (list(by_key.values()), list(by_key))
+    return index
+
+
+# ---------- entry lines ----------
+def _counted_bullets(entry_text: str) -> List[Tuple[int, str]]:
+    """(count, casefolded item) for every 'Nx item' bullet line after the header."""
+    items = []
+    for line in entry_text.splitlines()[1:]:
+        if not BULLET_PAT.match(line):
+            continue
+        item = BULLET_PAT.sub("", line, count=1)
+        m = COUNT_PAT.match(item)
+        if m:
+            query = _norm(item[m.end():]).rstrip(":").strip().casefold()
+            if query:
+                items.append((int(m.group(1)), query))
+    return items
+
+
+# ---------- matcher ----------
+def detect_wargear(
+    datasheets: List[Dict],
+    snapshot: Optional[CatalogSnapshot] = None,
+    min_score: int = WEAPON_MIN_SCORE,
+) -> List[Dict]:
+    """
+    Match the counted bullet lines of each resolved datasheet entry ('• 4x Bolt rifle')
+    against that datasheet's own weapons and set ds["wargear"] = [{"name", "count"}],
+    counts summed per weapon in order of first appearance. Model lines ('• 4x Intercessor')
+    score below `min_score` and are left out.
+    All lines of all datasheets are scored in ONE `cdist` against the union of their
+    weapons; each row is then masked to its own datasheet's columns.
+    """
+    snapshot = snapshot or get_catalog_snapshot()
+    index = snapshot.get_index("weapon_index", _build_weapon_index)
+
+    spans: Dict[str, Tuple[int, int]] = {}
+    names: List[str] = []
+    keys: List[str] = []
+    rows: List[Tuple[int, int, str]] = []  # (datasheet position, count, query)
+    for i, ds in enumerate(datasheets):
+        ds["wargear"] = []
+        weapons = index.get(ds.get("datasheet_id"))
+        if weapons is None:
+            continue
+        if ds["datasheet_id"] not in spans:
+            spans[ds["datasheet_id"]] = (len(keys), len(keys) + len(weapons[1]))
+            names.extend(weapons[0])
+            keys.extend(weapons[1])
+        rows.extend((i, count, query) for count, query in _counted_bullets(ds["entry_text"]))
+    if not rows:
+        return datasheets
+
+    scores = process.cdist(
+        [query for _, _, query in rows],
+        keys,
+        scorer=WEAPON_SCORER,
+        score_cutoff=min_score,
+        dtype=np.int32,
+        workers=settings.FUZZY_MATCH_WORKERS,
+    )
+    own = np.zeros(scores.shape, dtype=bool)
+    for r, (i, _, _) in enumerate(rows):
+        start, stop = spans[datasheets[i]["datasheet_id"]]
+        own[r, start:stop] = True
+    scores = np.where(own, scores, 0)
+    best = scores.argmax(axis=1)
+
+    counts: Dict[int, Dict[str, int]] = {}
+    for r, (i, count, _) in enumerate(rows):
+        if scores[r, best[r]] >= min_score:
+            per_ds = counts.setdefault(i, {})
+            name = names[best[r]]
+            per_ds[name] = per_ds.get(name, 0) + count
+    for i, per_ds in counts.items():
+        datasheets[i]["wargear"] = [{"name": n, "count": c} for n, c in per_ds.items()]
+    return datasheets
@@ -0,0 +1,75 @@
+import re
+from typing import Dict, List, Optional
+
+from list_parser.utils.shared_utils import _fold_chars, _norm
+
+# ---------- line patterns ----------
+POINTS_PAT = re.compile(r"\(\s*(\d+)\s*(pts|points?)\s*\)", re.IGNORECASE)
+COUNT_PAT = re.compile(r"^\s*(\d+)\s*x\s+", re.IGNORECASE)
+POINTS_SUFFIX_PAT = re.compile(r"\(\s*\d+\s*(?:pts|points?)\s*\)$", re.IGNORECASE)
+BULLET_PAT = re.compile(r"^\s*[•◦▪·*\-]\s*")
+
+# lines with this many points or more are summary totals, not units
+MAX_UNIT_POINTS = 1000
+
+
+def _header_query(line: str, norm) -> str:
+    """'2x Intercessor Squad (80 points)' -> 'Intercessor Squad'."""
+    h = COUNT_PAT.sub("", line.strip(), count=1).strip()
+    h = POINTS_SUFFIX_PAT.sub("", h, count=1).strip()
+    return norm(h)
+
+
+def _collapse_ws(s: str) -> str:
+    """The whitespace half of _norm, for text whose characters are already folded."""
+    return " ".join(s.split())
+
+
+def lex_army_list(army_text: str) -> Dict:
+    """
+    Scan an army list once and describe every line:
+      {"raw", "norm", "blank", "points", "header", "query"}
+    - points: the '(N points|pts)' value or None
+    - header: starts a datasheet block (has points, below MAX_UNIT_POINTS)
+    - query:  the datasheet lookup string for header lines, else None
+    Also returns "text_norm", the whole text normalized as one string.
+    Pure-ASCII input skips NFKC normalization.
+    """
+    raw_lines = army_text.splitlines()
+    if army_text.isascii():
+        # NFKC and the quote/dash replacements are no-ops on ASCII
+        folded_lines, norm = raw_lines, _collapse_ws
+    else:
+        # fold the whole text once instead of once per line
+        folded_lines, norm = _fold_chars(army_text).splitlines(), _norm
+        if len(folded_lines) != len(raw_lines):
+            folded_lines = [_fold_chars(raw) for raw in raw_lines]
+
+    lines: List[Dict] = []
+    for raw, folded in zip(raw_lines, folded_lines):
+        line_norm = _collapse_ws(folded)
+        points = None
+        if "(" in raw:
+            m = POINTS_PAT.search(raw)
+            if m:
+                points = int(m.group(1))
+        header = points is not None and points < MAX_UNIT_POINTS
+        lines.append(
+            {
+                "raw": raw,
+                "norm": line_norm,
+                "blank": not raw.strip(),
+                "points": points,
+                "header": header,
+                "query": _header_query(raw, norm) if header else None,
+            }
+        )
+    return {
+        "lines": lines,
+        "text_norm": " ".join(ln["norm"] for ln in lines if ln["norm"]),
+    }
+
+
+def ensure_lexed(army_text: str, lexed: Optional[Dict] = None) -> Dict:
+    """Reuse an already lexed list (shared across detectors) or lex `army_text`."""
+    return lexed if lexed is not None else lex_army_list(army_text)
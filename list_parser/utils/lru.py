@@ -0,0 +1,54 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU. Bounded by total weight: every entry weighs
+    `weigh(key, value)` (1 by default, i.e. an entry count), and the least
+    recently used entries are evicted until the total is back under `max_weight`.
+    """
+
+    def __init__(
+        self,
+        max_weight: int,
+        weigh: Optional[Callable[[Hashable, Any], int]] = None,
+    ):
+        self.max_weight = max_weight
+        self._weigh = weigh or (lambda key, value: 1)
+        self._data: OrderedDict = OrderedDict()  # key -> (value, weight)
+        self._weight = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key][0]
+
+    def set(self, key, value):
+        weight = self._weigh(key, value)
+        with self._lock:
+            if key in self._data:
+                self._weight -= self._data.pop(key)[1]
+            if weight > self.max_weight:
+                return
+            self._data[key] = (value, weight)
+            self._weight += weight
+            while self._weight > self.max_weight:
+                _, (_, evicted) = self._data.popitem(last=False)
+                self._weight -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._weight = 0
+
+    @property
+    def weight(self) -> int:
+        return self._weight
+
+    def __len__(self):
+        return len(self._data)
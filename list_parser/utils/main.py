@@ -1,26 +1,243 @@
+import hashlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
 from list_parser.utils.detect_factions import detect_factions
-from list_parser.utils.detect_detachment import find_detachment_for_list, get_enhancement_names_for_detachment
-from list_parser.utils.detect_datasheets import detect_datasheets
+from list_parser.utils.detect_detachment import (
+    find_detachments_for_factions,
+    find_unit_enhancement,
+    get_enhancement_names_for_detachment,
+)
+from list_parser.utils.detect_datasheets import (
+    build_master_catalog,
+    detect_datasheets,
+    iter_datasheet_blocks,
+    parse_datasheet_blocks,
+    resolve_block_groups_to_datasheets_prefer,
+    resolve_blocks_to_datasheets_prefer,
+)
+from list_parser.utils.detect_wargear import detect_wargear
+from list_parser.utils.catalog import get_catalog_snapshot
+from list_parser.utils.lexer import lex_army_list
+from list_parser.utils.points import check_block_points, summarize_points
 
-def detect_entities(army_list: str):
-    """
-    Detect entities from the army list text.
-    Returns a list of detected entities with their details.
-    """
-    possible_faction = detect_factions(army_list)
-    possible_detachments = []
-    for f in possible_faction:
-        det = find_detachment_for_list(army_list, f["faction_id"])
-        possible_detachments.append(det)
-    best_det = max(possible_detachments, key=lambda d: d["score"]) if possible_detachments else None
+
+def _detect_factions_and_detachment(army_list: str, snapshot, lexed):
+    """Faction and best detachment (with its enhancement names) for one list."""
+    possible_faction = detect_factions(army_list, snapshot=snapshot, lexed=lexed)
+    possible_detachments = list(
+        find_detachments_for_factions(
+            army_list,
+            [f["faction_id"] for f in possible_faction],
+            snapshot=snapshot,
+            lexed=lexed,
+        ).values()
+    )
+    best_det = max(possible_detachments, key=lambda d: d["score"] or -1) if possible_detachments else None
     if best_det:
-        enhancement_names = get_enhancement_names_for_detachment(best_det["detachment_id"])
+        enhancement_names = get_enhancement_names_for_detachment(best_det["detachment_id"], snapshot)
         best_det["enhancement_names"] = enhancement_names
-    datasheets = detect_datasheets(army_list, [f["faction_id"] for f in possible_faction])
+    return possible_faction, best_det
+
+
+def _annotate_datasheets(datasheets: List[Dict], best_det: Optional[Dict], snapshot) -> List[Dict]:
+    """
+    Per resolved datasheet, set "enhancement" (the detachment enhancement its entry
+    names, or None), "points" (the listed cost checked against its points table)
+    and "wargear" (the weapons its entry lists, see detect_wargear).
+    """
+    detachment_id = best_det["detachment_id"] if best_det else None
+    for ds in datasheets:
+        entry_text = ds.get("entry_text", "")
+        ds["enhancement"] = find_unit_enhancement(entry_text, detachment_id, snapshot)
+        ds["points"] = check_block_points(
+            entry_text, snapshot.points_by_datasheet.get(ds["datasheet_id"]), ds["enhancement"]
+        )
+    return detect_wargear(datasheets, snapshot)
+
+
+def _header_signature(lexed: Dict, max_lines: int = 20) -> str:
+    """
+    Hash of the lines faction and detachment detection depend on: the first
+    `max_lines` lines (detachment candidates, as in find_detachments_for_factions),
+    every line outside a datasheet block and the unit names of the block headers
+    (a list naming no faction gets it from them, see vote_factions_from_datasheets).
+    Editing a unit's points or wargear leaves it unchanged.
+    """
+    digest = hashlib.sha1()
+    in_block = False
+    for i, line in enumerate(lexed["lines"]):
+        # same block boundaries as iter_datasheet_blocks
+        if line["header"]:
+            in_block = True
+        elif line["points"] is not None or line["blank"]:
+            in_block = False
+        if i < max_lines or not in_block:
+            digest.update(line["norm"].encode())
+            digest.update(b"\n")
+        elif line["header"]:
+            digest.update(line["query"].casefold().encode())
+            digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def detect_entities(army_list: str, snapshot=None):
+    """
+    Detect entities from the army list text.
+    Returns a list of detected entities with their details; each datasheet
+    carries the detachment enhancement named in its entry ("enhancement", or None)
+    and its points check ("points"), with army totals under "points".
+    """
+    snapshot = snapshot or get_catalog_snapshot()
+    lexed = lex_army_list(army_list)  # one scan shared by every detector
+    possible_faction, best_det = _detect_factions_and_detachment(army_list, snapshot, lexed)
+    datasheets = detect_datasheets(
+        army_list, [f["faction_id"] for f in possible_faction], snapshot, lexed=lexed
+    )
+    _annotate_datasheets(datasheets, best_det, snapshot)
     detected_entities = {
         "factions": possible_faction,
         "detachment": best_det,
-        "datasheets": datasheets
+        "datasheets": datasheets,
+        "points": summarize_points(datasheets),
+        "header_signature": _header_signature(lexed),
     }
 
     return detected_entities
+
+
+def detect_entities_stream(army_list: str, snapshot=None) -> Iterator[Tuple[str, object]]:
+    """
+    Detect entities stage by stage, yielding results as soon as they are known:
+    ("factions", [...]), ("detachment", {...}|None), ("header_signature", str),
+    then ("datasheet", {...}) for each block in list order.
+    """
+    snapshot = snapshot or get_catalog_snapshot()
+    lexed = lex_army_list(army_list)
+    possible_faction, best_det = _detect_factions_and_detachment(army_list, snapshot, lexed)
+    yield "factions", possible_faction
+    yield "detachment", best_det
+    yield "header_signature", _header_signature(lexed)
+
+    faction_ids = [f["faction_id"] for f in possible_faction]
+    catalog_all = build_master_catalog(snapshot)
+    for block in iter_datasheet_blocks(army_list, lexed):
+        datasheets = resolve_blocks_to_datasheets_prefer(
+            [block],
+            catalog_all,
+            faction_ids,
+            hi=92,
+            lo=70,
+            prefer_bonus=8,
+            snapshot=snapshot,
+        )
+        yield "datasheet", _annotate_datasheets(datasheets, best_det, snapshot)[0]
+
+
+def detect_entities_batch(
+    army_lists: List[str], snapshot=None
+) -> List[Tuple[Optional[Dict], Optional[str]]]:
+    """
+    Detect entities for many army lists against ONE catalog snapshot.
+    Factions and detachments are detected per list; the datasheet blocks of all
+    lists are then resolved together in a single matching pass.
+    Returns [(entities, None) | (None, error message)] in input order.
+    """
+    snapshot = snapshot or get_catalog_snapshot()
+    results: List[Tuple[Optional[Dict], Optional[str]]] = []
+    pending = []  # (result index, blocks, preferred faction ids)
+
+    for army_list in army_lists:
+        try:
+            lexed = lex_army_list(army_list)
+            possible_faction, best_det = _detect_factions_and_detachment(army_list, snapshot, lexed)
+            blocks = parse_datasheet_blocks(army_list, lexed)
+        except Exception as e:
+            results.append((None, str(e)))
+            continue
+        results.append(
+            (
+                {
+                    "factions": possible_faction,
+                    "detachment": best_det,
+                    "header_signature": _header_signature(lexed),
+                },
+                None,
+            )
+        )
+        pending.append((len(results) - 1, blocks, [f["faction_id"] for f in possible_faction]))
+
+    resolved = resolve_block_groups_to_datasheets_prefer(
+        [(blocks, faction_ids) for _, blocks, faction_ids in pending],
+        build_master_catalog(snapshot),
+        hi=92,
+        lo=70,
+        prefer_bonus=8,
+        snapshot=snapshot,
+    )
+    for (i, _, _), datasheets in zip(pending, resolved):
+        entities = results[i][0]
+        entities["datasheets"] = _annotate_datasheets(datasheets, entities["detachment"], snapshot)
+        entities["points"] = summarize_points(datasheets)
+
+    return results
+
+
+def detect_entities_incremental(
+    previous: Dict, army_list: str, snapshot=None
+) -> Tuple[Dict, Dict]:
+    """
+    Detect entities for an edited list, starting from `previous` (the entities of
+    an earlier version, same catalog generation):
+      - factions/detachment are reused unless the header lines changed
+      - blocks are diffed by content; unchanged blocks keep their resolution and
+        only new or edited blocks are resolved (all of them if the factions changed)
+    Returns (entities, {"blocks", "reused", "resolved", "header_changed"}).
+    """
+    snapshot = snapshot or get_catalog_snapshot()
+    lexed = lex_army_list(army_list)
+    signature = _header_signature(lexed)
+
+    header_changed = previous.get("header_signature") != signature
+    if header_changed:
+        possible_faction, best_det = _detect_factions_and_detachment(army_list, snapshot, lexed)
+    else:
+        possible_faction, best_det = previous["factions"], previous["detachment"]
+    faction_ids = [f["faction_id"] for f in possible_faction]
+
+    reusable = {}
+    if faction_ids == [f["faction_id"] for f in previous["factions"]]:
+        for ds in previous["datasheets"]:
+            reusable.setdefault(ds["entry_text"], ds)
+
+    blocks = parse_datasheet_blocks(army_list, lexed)
+    datasheets = [reusable.get(b["entry_text"]) for b in blocks]
+    changed = [i for i, ds in enumerate(datasheets) if ds is None]
+    if changed:
+        resolved = resolve_blocks_to_datasheets_prefer(
+            [blocks[i] for i in changed],
+            build_master_catalog(snapshot),
+            faction_ids,
+            hi=92,
+            lo=70,
+            prefer_bonus=8,
+            snapshot=snapshot,
+        )
+        for i, ds in zip(changed, resolved):
+            datasheets[i] = ds
+    # cheap enough to redo for every block; the detachment may have changed
+    datasheets = _annotate_datasheets([dict(ds) for ds in datasheets], best_det, snapshot)
+
+    entities = {
+        "factions": possible_faction,
+        "detachment": best_det,
+        "datasheets": datasheets,
+        "points": summarize_points(datasheets),
+        "header_signature": signature,
+    }
+    stats = {
+        "blocks": len(blocks),
+        "reused": len(blocks) - len(changed),
+        "resolved": len(changed),
+        "header_changed": header_changed,
+    }
+    return entities, stats
@@ -0,0 +1,174 @@
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class MatchingPoolBusy(Exception):
+    """The matching queue is full; the caller should retry later."""
+
+
+class MatchingTimeout(Exception):
+    """Matching did not finish within the per-request deadline."""
+
+
+# ---------- worker side ----------
+def _init_worker():
+    """Runs once in every pool process: set up Django and preload the catalog."""
+    import django
+
+    django.setup()
+    from list_parser.utils.catalog import get_catalog_snapshot
+
+    # the pool already spreads work over cores; don't let rapidfuzz add threads
+    settings.FUZZY_MATCH_WORKERS = 1
+    get_catalog_snapshot()
+
+
+def _detect_entities(army_list: str) -> Dict:
+    from list_parser.utils.main import detect_entities
+
+    return detect_entities(army_list)
+
+
+def _detect_entities_batch(army_lists: List[str]) -> List:
+    from list_parser.utils.main import detect_entities_batch
+
+    return detect_entities_batch(army_lists)
+
+
+def _detect_entities_incremental(previous: Dict, army_list: str):
+    from list_parser.utils.main import detect_entities_incremental
+
+    return detect_entities_incremental(previous, army_list)
+
+
+def _warm_up() -> None:
+    """No-op task: submitting one per worker makes the pool spawn them all."""
+
+
+# ---------- web side ----------
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+_slots: Optional[threading.BoundedSemaphore] = None
+
+
+def _get_executor() -> Tuple[ProcessPoolExecutor, threading.BoundedSemaphore]:
+    """The pool and its queue slots (a reset pool gets a new semaphore)."""
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            workers = settings.MATCHING_POOL_WORKERS
+            logger.info(f"Starting matching pool with {workers} processes")
+            # spawn: children must not inherit DB connections or sentry threads
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+            _slots = threading.BoundedSemaphore(workers + settings.MATCHING_POOL_QUEUE_SIZE)
+        return _executor, _slots
+
+
+def start_matching_pool():
+    """
+    Start the pool's processes now (Django setup and catalog preload included)
+    rather than on the first cache miss. Call once per web worker after it forks;
+    does not wait for the processes to be ready.
+    """
+    if settings.MATCHING_POOL_WORKERS <= 0:
+        return
+    executor, _ = _get_executor()
+    for _ in range(settings.MATCHING_POOL_WORKERS):
+        executor.submit(_warm_up)
+
+
+def _reset_executor(broken: ProcessPoolExecutor):
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _run(fn, *args):
+    """
+    Run `fn(*args)` in the matching pool, or inline when the pool is disabled
+    (MATCHING_POOL_WORKERS = 0). Raises MatchingPoolBusy if the bounded queue is
+    full and MatchingTimeout if the result misses MATCHING_DEADLINE_SECONDS.
+    """
+    if settings.MATCHING_POOL_WORKERS <= 0:
+        return fn(*args)
+
+    # release into this pool's semaphore, even if the pool is reset meanwhile
+    executor, slots = _get_executor()
+    if not slots.acquire(blocking=False):
+        raise MatchingPoolBusy("Matching queue is full, please retry shortly")
+    try:
+        future = executor.submit(fn, *args)
+    except BrokenProcessPool:
+        slots.release()
+        _reset_executor(executor)
+        raise
+    future.add_done_callback(lambda _: slots.release())
+
+    try:
+        return future.result(timeout=settings.MATCHING_DEADLINE_SECONDS)
+    except FutureTimeoutError:
+        future.cancel()  # only helps if it never started; a running task finishes
+        raise MatchingTimeout("Matching took too long")
+    except BrokenProcessPool:
+        _reset_executor(executor)
+        raise
+
+
+def run_detect_entities_stream(army_list: str, snapshot=None) -> Iterator[Tuple[str, object]]:
+    """
+    detect_entities_stream() in this process, so stages reach the client as they
+    complete, under the pool's admission control: it holds one of the same queue
+    slots (MatchingPoolBusy if none is free) and raises MatchingTimeout once the
+    matching itself (not the time spent sending) passes MATCHING_DEADLINE_SECONDS.
+    """
+    from list_parser.utils.main import detect_entities_stream
+
+    slots = None
+    if settings.MATCHING_POOL_WORKERS > 0:
+        _, slots = _get_executor()
+        if not slots.acquire(blocking=False):
+            raise MatchingPoolBusy("Matching queue is full, please retry shortly")
+    try:
+        stages = detect_entities_stream(army_list, snapshot)
+        spent = 0.0
+        while True:
+            started = time.monotonic()
+            try:
+                stage = next(stages)
+            except StopIteration:
+                return
+            spent += time.monotonic() - started
+            if spent > settings.MATCHING_DEADLINE_SECONDS:
+                raise MatchingTimeout("Matching took too long")
+            yield stage
+    finally:
+        if slots is not None:
+            slots.release()
+
+
+def run_detect_entities(army_list: str) -> Dict:
+    return _run(_detect_entities, army_list)
+
+
+def run_detect_entities_batch(army_lists: List[str]) -> List:
+    return _run(_detect_entities_batch, army_lists)
+
+
+def run_detect_entities_incremental(previous: Dict, army_list: str):
+    return _run(_detect_entities_incremental, previous, army_list)
@@ -0,0 +1,83 @@
+import gzip
+import hashlib
+from typing import Dict, Optional, Set
+
+from django.http import HttpResponse, HttpResponseNotModified
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip variants are built
+    brotli = None
+
+# Content-Encoding -> ETag suffix; a strong ETag must differ per encoded representation
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+# preferred first
+ENCODING_ORDER = ("br", "gzip")
+
+
+# ---------- building ----------
+def build_payload(body: bytes) -> Dict:
+    """
+    Precompute everything needed to serve `body` repeatedly:
+      {"etag": <content hash>, "identity": body, "gzip": ..., "br": ...|None}
+    """
+    return {
+        "etag": hashlib.sha256(body).hexdigest()[:32],
+        "identity": body,
+        "gzip": gzip.compress(body, compresslevel=9, mtime=0),
+        "br": brotli.compress(body, quality=11) if brotli is not None else None,
+    }
+
+
+# ---------- serving ----------
+def _accepted_encodings(header: str) -> Set[str]:
+    """Codings listed in Accept-Encoding, minus those refused with q=0."""
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _etag(payload: Dict, encoding: Optional[str]) -> str:
+    return f'"{payload["etag"]}{ENCODINGS.get(encoding, "")}"'
+
+
+def payload_response(request, payload: Dict, content_type: str = "application/json") -> HttpResponse:
+    """
+    Serve a payload from build_payload: 304 if If-None-Match names any of its
+    representations, else the best precompressed variant the client accepts,
+    with a strong ETag and `Vary: Accept-Encoding`. Nothing is encoded per request.
+    """
+    accepted = _accepted_encodings(request.headers.get("Accept-Encoding", ""))
+    encoding = next(
+        (
+            e
+            for e in ENCODING_ORDER
+            if payload.get(e) is not None and (e in accepted or "*" in accepted)
+        ),
+        None,
+    )
+    etag = _etag(payload, encoding)
+
+    # If-None-Match uses the weak comparison: a proxy may have weakened our tag
+    if_none_match = request.headers.get("If-None-Match", "")
+    sent = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    known = {_etag(payload, e) for e in (None, *ENCODINGS)}
+    if if_none_match.strip() == "*" or known & sent:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(payload[encoding or "identity"], content_type=content_type)
+        if encoding:
+            response["Content-Encoding"] = encoding
+    response["ETag"] = etag
+    response["Vary"] = "Accept-Encoding"
+    return response
@@ -0,0 +1,94 @@
+from typing import Dict, List, Optional
+
+# composition tables are built at scrape time; re-exported for the catalog
+from datasheet_scraper.points import build_points_table  # noqa: F401
+from list_parser.utils.lexer import BULLET_PAT, COUNT_PAT, POINTS_PAT
+
+
+# ---------- block validation ----------
+def count_models(lines: List[str]) -> Optional[int]:
+    """
+    Sum of the 'Nx' counts on the outermost bullet lines of a unit entry
+    ('• 1x Intercessor Sergeant', '• 4x Intercessor'); nested wargear bullets
+    are ignored. None if no outermost bullet carries a count.
+    """
+    bullets = [ln for ln in lines if BULLET_PAT.match(ln)]
+    if not bullets:
+        return None
+    indent = min(len(ln) - len(ln.lstrip()) for ln in bullets)
+    total = None
+    for ln in bullets:
+        if len(ln) - len(ln.lstrip()) != indent:
+            continue
+        m = COUNT_PAT.match(BULLET_PAT.sub("", ln, count=1))
+        if m:
+            total = (total or 0) + int(m.group(1))
+    return total
+
+
+def check_block_points(
+    entry_text: str,
+    points_table: Optional[Dict[int, int]],
+    enhancement: Optional[str] = None,
+) -> Dict:
+    """
+    Compare a block's listed '(N points)' with the cost in its datasheet's
+    points table ({model count: points}):
+      {"listed", "expected", "models", "valid"}
+    The model count is read from the entry (see count_models); single-size units
+    need none. A 'Kx' header prefix multiplies the cost. The catalog carries no
+    enhancement costs, so a unit with an enhancement is valid at or above its cost.
+    expected/models/valid are None when the cost cannot be determined.
+    """
+    lines = entry_text.splitlines()
+    header = lines[0] if lines else ""
+    pts_m = POINTS_PAT.search(header)
+    listed = int(pts_m.group(1)) if pts_m else None
+    result = {"listed": listed, "expected": None, "models": None, "valid": None}
+    if listed is None or not points_table:
+        return result
+
+    count_m = COUNT_PAT.match(header)
+    units = int(count_m.group(1)) if count_m else 1
+    counted = count_models(lines[1:])
+    sizes = []
+    if counted is not None:
+        # the bullets may count the models of all K units or of one
+        if counted % units == 0:
+            sizes.append(counted // units)
+        sizes.append(counted)
+    sizes = [size for size in sizes if size in points_table]
+    if not sizes and len(points_table) == 1:
+        sizes = list(points_table)
+    if not sizes:
+        return result
+    models = next((size for size in sizes if points_table[size] * units == listed), sizes[0])
+
+    expected = points_table[models] * units
+    valid = listed == expected or (enhancement is not None and listed > expected)
+    result.update(expected=expected, models=models, valid=valid)
+    return result
+
+
+def summarize_points(datasheets: List[Dict]) -> Dict:
+    """
+    Army totals over the datasheets' "points" results:
+      {"listed": sum of listed points, "expected": sum of known costs,
+       "unverified": blocks without a known cost, "mismatched": blocks failing validation}
+    """
+    listed = expected = unverified = mismatched = 0
+    for ds in datasheets:
+        points = ds.get("points") or {}
+        listed += points.get("listed") or 0
+        if points.get("expected") is None:
+            unverified += 1
+        else:
+            expected += points["expected"]
+        if points.get("valid") is False:
+            mismatched += 1
+    return {
+        "listed": listed,
+        "expected": expected,
+        "unverified": unverified,
+        "mismatched": mismatched,
+    }
@@ -0,0 +1,119 @@
+import hashlib
+import threading
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from list_parser.utils.catalog import get_catalog_generation
+from list_parser.utils.lru import LRUCache
+from list_parser.utils.matching_pool import run_detect_entities
+
+DETECTION_CACHE_PREFIX = "detect"
+
+
+# ---------- content-addressed key ----------
+def _canonical_text(army_text: str) -> str:
+    """
+    Normalize only what cannot change the detection output: line endings and
+    trailing blank lines. Entry text is returned verbatim, so nothing else is touched.
+    """
+    lines = army_text.splitlines()
+    while lines and not lines[-1].strip():
+        lines.pop()
+    return "\n".join(lines)
+
+
+def content_hash(army_text: str) -> str:
+    """sha256 of the canonical text: equal for lists that detect identically."""
+    return hashlib.sha256(_canonical_text(army_text).encode()).hexdigest()
+
+
+def detection_token(army_text: str, generation: str) -> str:
+    """Opaque handle on a detection result, returned to clients as `result_token`."""
+    return f"{generation}:{content_hash(army_text)}"
+
+
+def detection_cache_key(army_text: str, generation: str) -> str:
+    return f"{DETECTION_CACHE_PREFIX}:{detection_token(army_text, generation)}"
+
+
+# ---------- in-process LRU (tier 1) ----------
+_local = LRUCache(settings.DETECTION_CACHE_LOCAL_SIZE)
+_stats = {"local_hits": 0, "redis_hits": 0, "misses": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(outcome: str):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def detection_cache_stats() -> Dict:
+    """Hit/miss counters for this process."""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = sum(stats.values())
+    hits = stats["local_hits"] + stats["redis_hits"]
+    stats["hit_rate"] = round(hits / lookups, 3) if lookups else None
+    stats["local_size"] = len(_local)
+    return stats
+
+
+# ---------- cached detection ----------
+def get_cached_entities(
+    army_list: str, generation: str
+) -> Tuple[Optional[Dict], str]:
+    """Look up a detection result: (entities, 'local-hit'|'redis-hit') or (None, 'miss')."""
+    return _lookup(detection_cache_key(army_list, generation))
+
+
+def get_entities_by_token(token: str) -> Optional[Dict]:
+    """The cached result behind a `result_token`, or None if it expired or is malformed."""
+    if not isinstance(token, str) or token.count(":") != 1:
+        return None
+    entities, _ = _lookup(f"{DETECTION_CACHE_PREFIX}:{token}")
+    return entities
+
+
+def _lookup(key: str) -> Tuple[Optional[Dict], str]:
+    entities = _local.get(key)
+    if entities is not None:
+        _count("local_hits")
+        return entities, "local-hit"
+
+    entities = cache.get(key)
+    if entities is not None:
+        _local.set(key, entities)
+        _count("redis_hits")
+        return entities, "redis-hit"
+
+    _count("misses")
+    return None, "miss"
+
+
+def store_entities(army_list: str, generation: str, entities: Dict) -> str:
+    """Cache a detection result; returns its result token."""
+    token = detection_token(army_list, generation)
+    key = f"{DETECTION_CACHE_PREFIX}:{token}"
+    cache.set(key, entities, timeout=settings.DETECTION_CACHE_TIMEOUT)
+    _local.set(key, entities)
+    return token
+
+
+def cached_detect_entities(
+    army_list: str, generation: Optional[str] = None
+) -> Tuple[Dict, str]:
+    """
+    detect_entities() behind a two-tier cache (in-process LRU, then Redis), keyed
+    by the text hash and the catalog generation, so a new scrape invalidates it.
+    Misses are computed in the matching pool.
+    Returns (entities, outcome) where outcome is 'local-hit', 'redis-hit' or 'miss'.
+    The cached entities are shared - treat them as read-only.
+    """
+    generation = generation or get_catalog_generation()
+    entities, outcome = get_cached_entities(army_list, generation)
+    if entities is None:
+        entities = run_detect_entities(army_list)
+        store_entities(army_list, generation, entities)
+    return entities, outcome
@@ -1,15 +1,30 @@
 import re, unicodedata
+from django.conf import settings
+from django.core.cache import cache
 from django.http import JsonResponse
 
 
 
-def _norm(s: str) -> str:
+def _fold_chars(s: str) -> str:
     s = unicodedata.normalize("NFKC", s)
-    s = s.replace("’", "'").replace("–", "-").replace("—", "-")
+    return s.replace("’", "'").replace("–", "-").replace("—", "-")
+
+
+def _norm(s: str) -> str:
+    s = _fold_chars(s)
     s = re.sub(r"\s+", " ", s).strip()
     return s
 
 
+def _strip_faction_prefix(faction_name: str) -> tuple[str, bool]:
+    """Remove codex prefixes and detect if it's a supplement."""
+    is_supplement = faction_name.lower().startswith("codex supplement:")
+    clean_name = re.sub(r"^codex supplement:\s*", "", faction_name, flags=re.I)
+    clean_name = re.sub(r"^codex:\s*", "", clean_name, flags=re.I)
+    clean_name = re.sub(r"^index:\s*", "", clean_name, flags=re.I)
+    return _norm(clean_name), is_supplement
+
+
 BASE_39K_URL = "https://39k.pro/"
 
 
@@ -34,40 +49,51 @@ def detachment_id_to_url(detachment_id: str) -> str:
     return f"{BASE_39K_URL}detachment/{detachment_id}/"
 
 
-def sanitized_response(entities):
-    """
-    Helper function to sanitize response and add URLs
-    """
-    factions_with_urls = [
+def sanitized_factions(factions):
+    return [
         {
             "faction_id": faction["faction_id"],
             "faction_name": faction["faction_name"],
             "is_supplement": faction.get("is_supplement", False),
             "url": faction_id_to_url(faction["faction_id"]),
         }
-        for faction in entities.get("factions", [])
+        for faction in factions
     ]
-    detachment_with_urls = [
-        {
-            "detachment_id": entities["detachment"].get("detachment_id"),
-            "detachment_name": entities["detachment"].get("detachment_name"),
-            "url": detachment_id_to_url(entities["detachment"].get("detachment_id")),
-            "enhancement_names": entities["detachment"].get("enhancement_names", []),
-        }
-    ]
-    datasheets_with_urls = [
+
+
+def sanitized_detachment(detachment):
+    return [
         {
-            "datasheet_id": ds["datasheet_id"],
-            "datasheet_name": ds["datasheet_name"],
-            "entry_text": ds.get("entry_text", ""),
-            "url": datasheet_id_to_url(ds["datasheet_id"]),
+            "detachment_id": detachment.get("detachment_id"),
+            "detachment_name": detachment.get("detachment_name"),
+            "url": detachment_id_to_url(detachment.get("detachment_id")),
+            "enhancement_names": detachment.get("enhancement_names", []),
         }
-        for ds in entities.get("datasheets", [])
     ]
+
+
+def sanitized_datasheet(ds):
     return {
-        "factions": factions_with_urls,
-        "detachment": detachment_with_urls,
-        "datasheets": datasheets_with_urls,
+        "datasheet_id": ds["datasheet_id"],
+        "datasheet_name": ds["datasheet_name"],
+        "entry_text": ds.get("entry_text", ""),
+        "method": ds.get("method"),
+        "enhancement": ds.get("enhancement"),
+        "points": ds.get("points"),
+        "wargear": ds.get("wargear"),
+        "url": datasheet_id_to_url(ds["datasheet_id"]),
+    }
+
+
+def sanitized_response(entities):
+    """
+    Helper function to sanitize response and add URLs
+    """
+    return {
+        "factions": sanitized_factions(entities.get("factions", [])),
+        "detachment": sanitized_detachment(entities["detachment"]),
+        "datasheets": [sanitized_datasheet(ds) for ds in entities.get("datasheets", [])],
+        "points": entities.get("points"),
     }
 
 
@@ -78,3 +104,38 @@ def ratelimit_error(request, exception):
     return JsonResponse(
         {"error": "Rate limit exceeded. Please try again later."}, status=429
     )
+
+
+# full parses of uncached lists, shared by every endpoint that can trigger one
+DETECTION_WORK_GROUP = "detect_entities"
+
+
+def _work_budget_key(request, group: str) -> str:
+    return f"work_budget:{group}:{request.META.get('REMOTE_ADDR')}"
+
+
+def work_budget_allows(request, group: str, units: int, limit: int) -> bool:
+    """Whether `units` more work fit in the client IP's budget for `group` (nothing is charged)."""
+    return units <= 0 or cache.get(_work_budget_key(request, group), 0) + units <= limit
+
+
+def charge_work_budget(request, group: str, units: int, window: int):
+    """Charge `units` of work done to the client IP's budget for `group` (fixed window of `window` seconds)."""
+    if units <= 0:
+        return
+    key = _work_budget_key(request, group)
+    cache.add(key, 0, timeout=window)
+    try:
+        cache.incr(key, units)
+    except ValueError:  # window expired between add() and incr()
+        cache.set(key, units, timeout=window)
+
+
+def detection_budget_allows(request, units: int = 1) -> bool:
+    """Whether the client may run `units` more full parses (see DETECTION_WORK_LIMIT)."""
+    return work_budget_allows(request, DETECTION_WORK_GROUP, units, settings.DETECTION_WORK_LIMIT)
+
+
+def charge_detection_work(request, units: int = 1):
+    """Charge `units` completed full parses to the client's detection budget."""
+    charge_work_budget(request, DETECTION_WORK_GROUP, units, settings.DETECTION_WORK_WINDOW)
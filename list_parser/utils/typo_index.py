@@ -0,0 +1,113 @@
+from typing import Dict, Iterable, Optional, Set
+
+from rapidfuzz.distance import OSA
+
+from list_parser.utils.catalog import CatalogSnapshot
+
+TYPO_INDEX_MAX_DISTANCE = 2
+
+
+def _max_distance(token: str) -> int:
+    """Edit budget by token length: short tokens are too easy to 'correct' into something else."""
+    if len(token) <= 3:
+        return 0
+    if len(token) <= 5:
+        return 1
+    return TYPO_INDEX_MAX_DISTANCE
+
+
+def _deletes(token: str, depth: int) -> Set[str]:
+    """All strings reachable from `token` by deleting up to `depth` characters (token included)."""
+    out = {token}
+    frontier = {token}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1 :] for w in frontier for i in range(len(w))}
+        out |= frontier
+    return out
+
+
+# ---------- index ----------
+def build_typo_index(names: Iterable[str]) -> Dict:
+    """
+    SymSpell-style deletion-neighbourhood index over the (casefolded) tokens of `names`:
+      {"vocab": {token: frequency}, "deletes": {deleted form: [tokens]},
+       "max_token_len": longest token, "max_tokens": most tokens in one name}
+    """
+    vocab: Dict[str, int] = {}
+    max_tokens = 0
+    for name in names:
+        tokens = name.casefold().split()
+        max_tokens = max(max_tokens, len(tokens))
+        for token in tokens:
+            vocab[token] = vocab.get(token, 0) + 1
+
+    deletes: Dict[str, list] = {}
+    for token in vocab:
+        for d in _deletes(token, _max_distance(token)):
+            deletes.setdefault(d, []).append(token)
+    return {
+        "vocab": vocab,
+        "deletes": deletes,
+        "max_token_len": max(map(len, vocab), default=0),
+        "max_tokens": max_tokens,
+    }
+
+
+def _build_snapshot_typo_index(snapshot: CatalogSnapshot) -> Dict:
+    detachment_names = (
+        d["name_norm"] for dets in snapshot.detachments_by_faction.values() for d in dets
+    )
+    names = list(snapshot.datasheet_names) + list(detachment_names)
+    return build_typo_index(names)
+
+
+def get_typo_index(snapshot: CatalogSnapshot) -> Dict:
+    """Typo index over datasheet and detachment names, built once per catalog generation."""
+    return snapshot.get_index("typo_index", _build_snapshot_typo_index)
+
+
+# ---------- lookup ----------
+def correct_token(token: str, index: Dict) -> Optional[str]:
+    """
+    Closest vocabulary token within the edit budget (optimal string alignment, so a
+    transposition counts once); ties go to the more frequent token. None if nothing is close.
+    """
+    vocab = index["vocab"]
+    if token in vocab:
+        return token
+    budget = _max_distance(token)
+    # no vocabulary token is within the budget; also keeps _deletes off long junk tokens
+    if budget == 0 or len(token) > index["max_token_len"] + budget:
+        return None
+
+    candidates = set()
+    for d in _deletes(token, budget):
+        candidates.update(index["deletes"].get(d, ()))
+
+    best = None
+    for cand in candidates:
+        dist = OSA.distance(token, cand, score_cutoff=budget)
+        if dist > budget:
+            continue
+        key = (dist, -vocab[cand], cand)
+        if best is None or key < best:
+            best = key
+    return best[2] if best else None
+
+
+def correct_query(query: str, index: Dict) -> Optional[str]:
+    """
+    Correct every token of `query` against the index. Returns the corrected
+    (casefolded) query, or None if some token has no close vocabulary match or
+    the query has more tokens than any indexed name.
+    """
+    tokens = query.casefold().split()
+    if len(tokens) > index["max_tokens"]:
+        return None
+    corrected = []
+    for token in tokens:
+        fixed = correct_token(token, index)
+        if fixed is None:
+            return None
+        corrected.append(fixed)
+    return " ".join(corrected)
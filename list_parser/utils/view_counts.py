@@ -0,0 +1,119 @@
+import logging
+import uuid
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from list_parser.models import SharedList, ViewCountFlush
+
+logger = logging.getLogger(__name__)
+
+# shared list id -> views not yet written to Postgres
+VIEW_COUNTS_KEY = "shared_list_views"
+# the hash being written by a flush (renamed from VIEW_COUNTS_KEY)
+VIEW_COUNTS_FLUSHING_KEY = "shared_list_views:flushing"
+# id of the flush in progress; recorded in Postgres (ViewCountFlush) when applied
+VIEW_COUNTS_FLUSH_ID_KEY = "shared_list_views:flush_id"
+# shared list id -> view_count in Postgres, so the live count needs no query
+VIEW_COUNTS_STORED_KEY = "shared_list_views:stored"
+# held while flushing, so overlapping runs cannot both apply the same hash
+VIEW_COUNTS_LOCK_KEY = "shared_list_views:lock"
+VIEW_COUNTS_LOCK_TIMEOUT = 5 * 60
+# applied flush ids are kept this long to recognise a retried flush
+VIEW_COUNT_FLUSH_RETENTION = timedelta(days=1)
+
+_client: Optional[redis.Redis] = None
+
+
+def _redis() -> redis.Redis:
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.VIEW_COUNT_REDIS_URL)
+    return _client
+
+
+def record_view(shared_list_id: int, stored_count: int) -> int:
+    """
+    Count one view with an atomic HINCRBY (no database write) and return the live
+    count: the view_count in Postgres plus the views not yet flushed.
+    `stored_count` is the caller's (possibly cached) copy of view_count; it is only
+    used until a flush has recorded the real one. Falls back to it if Redis is down.
+    """
+    try:
+        pipe = _redis().pipeline()
+        pipe.hincrby(VIEW_COUNTS_KEY, shared_list_id, 1)
+        pipe.hget(VIEW_COUNTS_FLUSHING_KEY, shared_list_id)
+        pipe.hsetnx(VIEW_COUNTS_STORED_KEY, shared_list_id, stored_count)
+        pipe.hget(VIEW_COUNTS_STORED_KEY, shared_list_id)
+        pending, flushing, _, stored = pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Could not record shared list view: {e}")
+        return stored_count
+    return int(stored) + pending + int(flushing or 0)
+
+
+def flush_view_counts() -> int:
+    """
+    Write the buffered views to Postgres: the pending hash is renamed (atomically,
+    so new views start a fresh hash), then applied with one F() UPDATE per distinct
+    increment. A hash left by an interrupted flush is applied first.
+    Runs under a Redis lock (an overlapping run returns 0) and is safe to retry:
+    each hash gets a flush id, recorded in the transaction that applies it, so a
+    hash whose flush crashed after the commit is cleaned up without re-applying it.
+    Returns the number of views written.
+    """
+    client = _redis()
+    lock = client.lock(VIEW_COUNTS_LOCK_KEY, timeout=VIEW_COUNTS_LOCK_TIMEOUT)
+    if not lock.acquire(blocking=False):
+        logger.info("Shared list view flush already running, skipping")
+        return 0
+    try:
+        return _flush(client)
+    finally:
+        try:
+            lock.release()
+        except redis.exceptions.LockError:  # expired during a very long flush
+            logger.warning("Shared list view flush outlived its lock")
+
+
+def _flush(client: redis.Redis) -> int:
+    if not client.exists(VIEW_COUNTS_FLUSHING_KEY):
+        try:
+            client.rename(VIEW_COUNTS_KEY, VIEW_COUNTS_FLUSHING_KEY)
+        except redis.ResponseError:  # no views since the last flush
+            return 0
+    # kept if a previous attempt at this hash already set it
+    client.set(VIEW_COUNTS_FLUSH_ID_KEY, uuid.uuid4().hex, nx=True)
+    flush_id = client.get(VIEW_COUNTS_FLUSH_ID_KEY).decode()
+
+    ids_by_increment: Dict[int, List[int]] = {}
+    for shared_list_id, views in client.hgetall(VIEW_COUNTS_FLUSHING_KEY).items():
+        ids_by_increment.setdefault(int(views), []).append(int(shared_list_id))
+
+    with transaction.atomic():
+        _, first_attempt = ViewCountFlush.objects.get_or_create(flush_id=flush_id)
+        if first_attempt:
+            for views, ids in ids_by_increment.items():
+                SharedList.objects.filter(pk__in=ids).update(view_count=F("view_count") + views)
+        ViewCountFlush.objects.filter(
+            applied_at__lt=timezone.now() - VIEW_COUNT_FLUSH_RETENTION
+        ).delete()
+    stored = SharedList.objects.filter(
+        pk__in=[pk for ids in ids_by_increment.values() for pk in ids]
+    ).values_list("pk", "view_count")
+
+    # new stored counts and the end of the flush become visible together
+    pipe = client.pipeline(transaction=True)
+    for shared_list_id, view_count in stored:
+        pipe.hset(VIEW_COUNTS_STORED_KEY, shared_list_id, view_count)
+    pipe.delete(VIEW_COUNTS_FLUSHING_KEY, VIEW_COUNTS_FLUSH_ID_KEY)
+    pipe.execute()
+    if not first_attempt:
+        logger.info(f"Shared list view flush {flush_id} was already applied")
+        return 0
+    return sum(views * len(ids) for views, ids in ids_by_increment.items())
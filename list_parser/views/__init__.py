@@ -1,5 +1,9 @@
 from .app_views import index, health
-from .army_detection_views import detect_army_entities
+from .army_detection_views import (
+    detect_army_entities,
+    detect_army_entities_batch,
+    detect_army_entities_incremental,
+)
 from .game_data_views import (
     get_datasheet,
     get_datasheet_with_enhancement,
@@ -12,6 +16,8 @@ __all__ = [
     'index',
     'health',
     'detect_army_entities',
+    'detect_army_entities_batch',
+    'detect_army_entities_incremental',
     'get_datasheet',
     'get_datasheet_with_enhancement',
     'get_faction',
@@ -2,6 +2,8 @@ from django.http import JsonResponse, HttpResponse
 from django.conf import settings
 import os
 
+from ..utils.result_cache import detection_cache_stats
+
 
 def index(request):
     """Serve React app"""
@@ -19,4 +21,4 @@ def index(request):
 
 
 def health(request):
-    return JsonResponse({"status": "ok"})
\ No newline at end of file
+    return JsonResponse({"status": "ok", "detection_cache": detection_cache_stats()})
\ No newline at end of file
@@ -1,11 +1,105 @@
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django_ratelimit.decorators import ratelimit
 import json
 
-from ..utils.main import detect_entities
-from ..utils.shared_utils import sanitized_response
+from ..utils.catalog import get_catalog_generation, get_catalog_snapshot
+from ..utils.matching_pool import (
+    MatchingPoolBusy,
+    MatchingTimeout,
+    run_detect_entities,
+    run_detect_entities_batch,
+    run_detect_entities_incremental,
+    run_detect_entities_stream,
+)
+from ..utils.points import summarize_points
+from ..utils.result_cache import (
+    detection_cache_key,
+    detection_token,
+    get_cached_entities,
+    get_entities_by_token,
+    store_entities,
+)
+from ..utils.shared_utils import (
+    charge_detection_work,
+    detection_budget_allows,
+    ratelimit_error,
+    sanitized_datasheet,
+    sanitized_detachment,
+    sanitized_factions,
+    sanitized_response,
+)
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+# an incremental re-parse reusing less than this share of blocks costs a full parse
+INCREMENTAL_MIN_REUSE = 0.5
+
+
+def _wants_stream(request):
+    """Streaming is opt-in: `Accept: application/x-ndjson` or `?stream=1`."""
+    return NDJSON_CONTENT_TYPE in request.headers.get("Accept", "") or request.GET.get(
+        "stream"
+    ) in ("1", "true")
+
+
+def _cached_stages(entities):
+    yield "factions", entities["factions"]
+    yield "detachment", entities["detachment"]
+    for ds in entities["datasheets"]:
+        yield "datasheet", ds
+
+
+def _ndjson_stream(request, army_list, cached):
+    """
+    One JSON object per line: factions, detachment, each datasheet as it is
+    resolved, then {"type": "done"}. Failures end the stream with {"type": "error"}.
+    `cached` is the view's (entities, outcome) cache lookup. Matching runs in this
+    process so stages can be sent as they complete, within the matching pool's
+    queue limit and deadline (see run_detect_entities_stream).
+    """
+    try:
+        snapshot = get_catalog_snapshot()
+        entities, cache_outcome = cached
+        stages = _cached_stages(entities) if entities else run_detect_entities_stream(army_list, snapshot)
+
+        collected = {"datasheets": []}
+        for stage, value in stages:
+            if stage == "header_signature":
+                collected[stage] = value
+                continue
+            if stage == "factions":
+                collected["factions"] = value
+                line = {"type": "factions", "factions": sanitized_factions(value)}
+            elif stage == "detachment":
+                collected["detachment"] = value
+                line = {"type": "detachment", "detachment": sanitized_detachment(value)}
+            else:
+                line = {
+                    "type": "datasheet",
+                    "index": len(collected["datasheets"]),
+                    "datasheet": sanitized_datasheet(value),
+                }
+                collected["datasheets"].append(value)
+            yield json.dumps(line) + "\n"
+
+        collected["points"] = summarize_points(collected["datasheets"])
+        if entities is None:
+            store_entities(army_list, snapshot.generation, collected)
+            charge_detection_work(request)
+        yield json.dumps(
+            {
+                "type": "done",
+                "datasheet_count": len(collected["datasheets"]),
+                "points": collected["points"],
+                "cache": cache_outcome,
+                "result_token": detection_token(army_list, snapshot.generation),
+            }
+        ) + "\n"
+
+    except Exception as e:
+        yield json.dumps({"type": "error", "error": str(e)}) + "\n"
 
 
 @ratelimit(key='ip', rate='50/hr', method='POST')
@@ -21,10 +115,185 @@ def detect_army_entities(request):
                 {"error": "army_list parameter is required"}, status=400
             )
 
-        entities = detect_entities(army_list)
-        return JsonResponse(sanitized_response(entities))
+        # only cache misses are charged to the client's detection budget
+        generation = get_catalog_generation()
+        entities, cache_outcome = get_cached_entities(army_list, generation)
+        if entities is None and not detection_budget_allows(request):
+            return ratelimit_error(request, None)
+
+        if _wants_stream(request):
+            response = StreamingHttpResponse(
+                _ndjson_stream(request, army_list, (entities, cache_outcome)),
+                content_type=NDJSON_CONTENT_TYPE,
+            )
+            response["X-Accel-Buffering"] = "no"  # let proxies pass lines through
+            return response
+
+        if entities is None:
+            entities = run_detect_entities(army_list)
+            store_entities(army_list, generation, entities)
+            charge_detection_work(request)
+        payload = sanitized_response(entities)
+        payload["result_token"] = detection_token(army_list, generation)
+        response = JsonResponse(payload)
+        response["X-Detection-Cache"] = cache_outcome
+        return response
+
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    except MatchingPoolBusy as e:
+        response = JsonResponse({"error": str(e)}, status=503)
+        response["Retry-After"] = "5"
+        return response
+    except MatchingTimeout as e:
+        return JsonResponse({"error": str(e)}, status=504)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+@ratelimit(key='ip', rate='300/hr', method='POST')
+@csrf_exempt
+@require_http_methods(["POST"])
+def detect_army_entities_incremental(request):
+    """
+    Re-detect an edited list. Body: {"previous_token": <result_token of the earlier
+    version>, "army_list": <new text>}. Only changed unit blocks are re-resolved,
+    and factions/detachment only if the lines around the units changed. An unknown
+    or stale token (new catalog generation, expired) falls back to a full parse.
+    A full parse, or a re-parse that redid the factions or reused under
+    INCREMENTAL_MIN_REUSE of the blocks, is charged to the same detection budget
+    as /api/detect-entities/; any uncached request needs budget left.
+    """
+    try:
+        body = json.loads(request.body)
+        army_list = body.get("army_list")
+
+        if not army_list:
+            return JsonResponse(
+                {"error": "army_list parameter is required"}, status=400
+            )
+
+        generation = get_catalog_generation()
+        token = detection_token(army_list, generation)
+        entities, cache_outcome = get_cached_entities(army_list, generation)
+        stats = None
+        if entities is None:
+            if not detection_budget_allows(request):
+                return ratelimit_error(request, None)
+            previous_token = body.get("previous_token")
+            previous = None
+            if isinstance(previous_token, str) and previous_token.startswith(f"{generation}:"):
+                previous = get_entities_by_token(previous_token)
+            if previous is not None and "header_signature" in previous:
+                entities, stats = run_detect_entities_incremental(previous, army_list)
+                if stats["header_changed"] or stats["reused"] < INCREMENTAL_MIN_REUSE * stats["blocks"]:
+                    charge_detection_work(request)
+            else:
+                entities = run_detect_entities(army_list)
+                charge_detection_work(request)
+            store_entities(army_list, generation, entities)
+
+        payload = sanitized_response(entities)
+        payload["result_token"] = token
+        payload["incremental"] = stats
+        response = JsonResponse(payload)
+        response["X-Detection-Cache"] = cache_outcome
+        return response
+
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    except MatchingPoolBusy as e:
+        response = JsonResponse({"error": str(e)}, status=503)
+        response["Retry-After"] = "5"
+        return response
+    except MatchingTimeout as e:
+        return JsonResponse({"error": str(e)}, status=504)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def detect_army_entities_batch(request):
+    """
+    Detect entities for many army lists in one request.
+    Body: {"army_lists": [<text>, ...]}. Results come back in input order, each
+    either {"index", "result", "cache"} or {"index", "error"}. Only lists that
+    actually need parsing (cache misses) are charged, to the same per-IP detection
+    budget as /api/detect-entities/, and only once the matching pool has run them.
+    """
+    try:
+        body = json.loads(request.body)
+        army_lists = body.get("army_lists")
+
+        if not isinstance(army_lists, list) or not army_lists:
+            return JsonResponse(
+                {"error": "army_lists parameter is required"}, status=400
+            )
+        if len(army_lists) > settings.DETECTION_BATCH_MAX_LISTS:
+            return JsonResponse(
+                {
+                    "error": f"At most {settings.DETECTION_BATCH_MAX_LISTS} army lists per batch"
+                },
+                status=400,
+            )
+
+        generation = get_catalog_generation()
+        items = [None] * len(army_lists)
+        to_parse, duplicates = [], {}  # duplicates: index -> index of first copy
+        first_by_key = {}
+        for i, army_list in enumerate(army_lists):
+            if not isinstance(army_list, str) or not army_list.strip():
+                items[i] = {"index": i, "error": "army_list must be a non-empty string"}
+                continue
+            key = detection_cache_key(army_list, generation)
+            if key in first_by_key:
+                duplicates[i] = first_by_key[key]
+                continue
+            first_by_key[key] = i
+            entities, cache_outcome = get_cached_entities(army_list, generation)
+            if entities is None:
+                to_parse.append(i)
+            else:
+                items[i] = (entities, cache_outcome)
+
+        if not detection_budget_allows(request, len(to_parse)):
+            return ratelimit_error(request, None)
+
+        parsed = run_detect_entities_batch([army_lists[i] for i in to_parse]) if to_parse else []
+        charge_detection_work(request, len(to_parse))
+        for i, (entities, error) in zip(to_parse, parsed):
+            if error is None:
+                store_entities(army_lists[i], generation, entities)
+                items[i] = (entities, "miss")
+            else:
+                items[i] = {"index": i, "error": error}
+        for i, first in duplicates.items():
+            items[i] = items[first] if isinstance(items[first], tuple) else {**items[first], "index": i}
+
+        results = []
+        for i, item in enumerate(items):
+            if isinstance(item, tuple):
+                entities, cache_outcome = item
+                try:
+                    item = {
+                        "index": i,
+                        "result": sanitized_response(entities),
+                        "cache": cache_outcome,
+                    }
+                except Exception as e:
+                    item = {"index": i, "error": str(e)}
+            results.append(item)
+
+        return JsonResponse({"results": results, "work_units": len(to_parse)})
 
     except json.JSONDecodeError:
         return JsonResponse({"error": "Invalid JSON"}, status=400)
+    except MatchingPoolBusy as e:
+        response = JsonResponse({"error": str(e)}, status=503)
+        response["Retry-After"] = "5"
+        return response
+    except MatchingTimeout as e:
+        return JsonResponse({"error": str(e)}, status=504)
     except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
\ No newline at end of file
+        return JsonResponse({"error": str(e)}, status=500)
@@ -5,6 +5,28 @@ from django.views.decorators.cache import cache_page
 from django_ratelimit.decorators import ratelimit
 
 from datasheet_scraper.models import FactionJson, DetachmentJson, DatasheetJson
+from ..utils.payloads import payload_response
+
+# pre-serialized copies of `data`, written on save by the scrape pipeline
+PRESERIALIZED_FIELDS = ("data_body", "data_body_gzip", "data_etag")
+
+
+def _entity_response(request, model, **lookup):
+    """
+    Send an entity's pre-serialized data as stored (gzip if accepted, with an ETag),
+    without loading or re-encoding the JSON column. Rows not yet pre-serialized
+    fall back to JsonResponse.
+    """
+    entity = get_object_or_404(model.objects.only(*PRESERIALIZED_FIELDS), **lookup)
+    if entity.data_body is None:
+        return JsonResponse(entity.data)
+    payload = {
+        "etag": entity.data_etag,
+        "identity": bytes(entity.data_body),
+        "gzip": bytes(entity.data_body_gzip),
+        "br": None,
+    }
+    return payload_response(request, payload)
 
 
 @cache_page(60 * 60 * 24 * 7)  # Cache for 7 days
@@ -15,8 +37,7 @@ def get_datasheet(request, datasheet_id):
     Retrieve a datasheet by its ID from the database without enhancement
     """
     try:
-        datasheet = get_object_or_404(DatasheetJson, datasheet_id=datasheet_id)
-        return JsonResponse(datasheet.data)
+        return _entity_response(request, DatasheetJson, datasheet_id=datasheet_id)
 
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
@@ -39,12 +60,16 @@ def get_datasheet_with_enhancement(request, datasheet_id):
             )
 
         # Get base datasheet data
-        datasheet = get_object_or_404(DatasheetJson, datasheet_id=datasheet_id)
+        datasheet = get_object_or_404(
+            DatasheetJson.objects.defer(*PRESERIALIZED_FIELDS), datasheet_id=datasheet_id
+        )
         datasheet_data = datasheet.data
 
         # Try to find matching enhancement
         try:
-            detachment = get_object_or_404(DetachmentJson, detachment_id=detachment_id)
+            detachment = get_object_or_404(
+                DetachmentJson.objects.defer(*PRESERIALIZED_FIELDS), detachment_id=detachment_id
+            )
             enhancements = detachment.data.get("enhancements", [])
 
             for enhancement in enhancements:
@@ -74,8 +99,7 @@ def get_faction(request, faction_id):
     Retrieve faction rules by faction ID from the database
     """
     try:
-        faction = get_object_or_404(FactionJson, faction_id=faction_id)
-        return JsonResponse(faction.data)
+        return _entity_response(request, FactionJson, faction_id=faction_id)
 
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
@@ -89,8 +113,7 @@ def get_detachment(request, detachment_id):
     Retrieve detachment rules and enhancements by detachment ID from the database
     """
     try:
-        detachment = get_object_or_404(DetachmentJson, detachment_id=detachment_id)
-        return JsonResponse(detachment.data)
+        return _entity_response(request, DetachmentJson, detachment_id=detachment_id)
 
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
\ No newline at end of file
@@ -1,3 +1,6 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
 from django.shortcuts import get_object_or_404
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
@@ -5,7 +8,26 @@ from django.views.decorators.http import require_http_methods
 from django_ratelimit.decorators import ratelimit
 import json
 
-from ..models import SharedList
+from ..models import SharedList, SharedListContent
+from ..utils.catalog import get_catalog_generation
+from ..utils.matching_pool import MatchingPoolBusy, MatchingTimeout
+from ..utils.payloads import build_payload, payload_response
+from ..utils.result_cache import (
+    cached_detect_entities,
+    content_hash,
+    detection_token,
+    get_cached_entities,
+)
+from ..utils.shared_utils import sanitized_response
+from ..utils.view_counts import record_view
+
+SHARED_PAYLOAD_PREFIX = "shared_payload"
+
+
+def _server_parse(raw_text, generation):
+    """Detection result for `raw_text` as the detect endpoint returns it (usually a cache hit)."""
+    entities, _ = cached_detect_entities(raw_text, generation)
+    return sanitized_response(entities)
 
 
 @ratelimit(key='ip', rate='20/m', method='POST')
@@ -13,7 +35,12 @@ from ..models import SharedList
 @require_http_methods(["POST"])
 def share_list(request):
     """
-    Create a shared list and return the share URL
+    Create a shared list and return the share URL.
+    Text and parse are stored once per distinct (canonical) text, so sharing a
+    list that was shared before only adds a slug row. If the server has the
+    detection of raw_text cached (the client just parsed it), that is stored;
+    otherwise the client's parsed_data is kept unstamped and re-parsed on first
+    view. Sharing never triggers a parse itself.
     """
     try:
         body = json.loads(request.body)
@@ -27,20 +54,38 @@ def share_list(request):
                 {"error": "name, raw_text, and parsed_data are required"}, status=400
             )
 
+        text_hash = content_hash(raw_text)
+        content = SharedListContent.objects.filter(content_hash=text_hash).first()
+        if content is None:
+            generation = get_catalog_generation()
+            entities, _ = get_cached_entities(raw_text, generation)
+            if entities is not None:
+                parsed_data = sanitized_response(entities)
+            else:
+                generation = ""
+            # a concurrent share of the same text may have created it meanwhile
+            content, _ = SharedListContent.objects.get_or_create(
+                content_hash=text_hash,
+                defaults={
+                    "raw_text": raw_text,
+                    "parsed_data": parsed_data,
+                    "catalog_generation": generation,
+                },
+            )
+
         # Create shared list
-        shared_list = SharedList.objects.create(
-            name=name, raw_text=raw_text, parsed_data=parsed_data
-        )
+        shared_list = SharedList.objects.create(name=name, content=content)
+        slug = shared_list.slug
 
         # Build the share URL
         if "localhost" in source_url:
-            share_url = f"http://localhost:3000/shared/{shared_list.slug}/"
+            share_url = f"http://localhost:3000/shared/{slug}/"
         else:
-            share_url = request.build_absolute_uri(f"/shared/{shared_list.slug}/")
+            share_url = request.build_absolute_uri(f"/shared/{slug}/")
             share_url = share_url.replace("http://", "https://")
 
         return JsonResponse(
-            {"success": True, "slug": shared_list.slug, "share_url": share_url}
+            {"success": True, "slug": slug, "share_url": share_url}
         )
 
     except json.JSONDecodeError:
@@ -49,26 +94,70 @@ def share_list(request):
         return JsonResponse({"error": str(e)}, status=500)
 
 
+def _build_shared_payload(shared_list, generation):
+    """
+    Serialize a shared list once into a precompressed payload (see utils.payloads),
+    refreshing a parse from an older catalog generation first and writing it back
+    (once for every slug sharing the content).
+    Everything in the body is immutable; the view count is sent as X-View-Count.
+    Returns (payload, cacheable): a parse that could not be refreshed is not cached.
+    """
+    content = shared_list.content
+    if content.catalog_generation != generation:
+        try:
+            content.parsed_data = _server_parse(content.raw_text, generation)
+            content.catalog_generation = generation
+            SharedListContent.objects.filter(pk=content.pk).update(
+                parsed_data=content.parsed_data, catalog_generation=generation
+            )
+        except (MatchingPoolBusy, MatchingTimeout):
+            pass
+
+    fresh = content.catalog_generation == generation
+    body = json.dumps(
+        {
+            "name": shared_list.name,
+            "raw_text": content.raw_text,
+            "parsed_data": content.parsed_data,
+            "catalog_generation": content.catalog_generation or None,
+            "result_token": detection_token(content.raw_text, generation) if fresh else None,
+            "created_at": shared_list.created_at.isoformat(),
+        },
+        cls=DjangoJSONEncoder,
+    ).encode()
+    payload = build_payload(body)
+    payload["id"] = shared_list.pk
+    payload["view_count"] = shared_list.view_count
+    return payload, fresh
+
+
 @require_http_methods(["GET"])
 def get_shared_list(request, slug):
     """
-    Retrieve a shared list by slug
+    Retrieve a shared list by slug, with a parse valid for the current catalog.
+    The serialized body (plus gzip/brotli variants) is cached per slug and catalog
+    generation, so repeat views and `If-None-Match` revalidations (304) do not touch
+    Postgres. A parse from an older catalog generation is redone once and written
+    back; if matching is busy the stored parse is served as is (see catalog_generation).
+    The live view count is returned in the X-View-Count header.
     """
     try:
-        shared_list = get_object_or_404(SharedList, slug=slug)
-
-        # Increment view count
-        shared_list.increment_view_count()
+        generation = get_catalog_generation()
+        key = f"{SHARED_PAYLOAD_PREFIX}:{generation}:{slug}"
+        payload = cache.get(key)
+        if payload is None:
+            shared_list = get_object_or_404(
+                SharedList.objects.select_related("content"), slug=slug
+            )
+            payload, cacheable = _build_shared_payload(shared_list, generation)
+            if cacheable:
+                cache.set(key, payload, timeout=settings.SHARED_LIST_PAYLOAD_TIMEOUT)
 
-        return JsonResponse(
-            {
-                "name": shared_list.name,
-                "raw_text": shared_list.raw_text,
-                "parsed_data": shared_list.parsed_data,
-                "created_at": shared_list.created_at.isoformat(),
-                "view_count": shared_list.view_count,
-            }
-        )
+        response = payload_response(request, payload)
+        # count the view (buffered in Redis, see utils.view_counts)
+        response["X-View-Count"] = record_view(payload["id"], payload["view_count"])
+        response["Cache-Control"] = "no-cache"  # revalidate every view, so it is counted
+        return response
 
     except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
\ No newline at end of file
+        return JsonResponse({"error": str(e)}, status=500)
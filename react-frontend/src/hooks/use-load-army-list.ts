@@ -1,6 +1,6 @@
 import { useEffect } from "react";
 import { useSetAtom } from "jotai";
-import { getListById } from "@/lib/storage.ts";
+import { getListById, saveList } from "@/lib/storage.ts";
 import { useParams, useSearchParams } from "react-router-dom";
 import useParseArmyList from "@/hooks/use-parse-army-list.ts";
 import {
@@ -9,6 +9,7 @@ import {
   loadingAtom,
   errorAtom,
   sharedListInfoAtom,
+  parsedDataAtom,
 } from "@/atoms/parse-atoms";
 
 const useLoadArmyList = () => {
@@ -21,6 +22,7 @@ const useLoadArmyList = () => {
   const setLoading = useSetAtom(loadingAtom);
   const setError = useSetAtom(errorAtom);
   const setSharedListInfo = useSetAtom(sharedListInfoAtom);
+  const setParsedData = useSetAtom(parsedDataAtom);
 
   useEffect(() => {
     const loadSharedList = async (slug: string) => {
@@ -34,10 +36,17 @@ const useLoadArmyList = () => {
           setArmyList(data.raw_text);
           setListName(sharedName);
           setSharedListInfo({
-            viewCount: data.view_count,
+            viewCount: Number(response.headers.get("X-View-Count") ?? data.view_count),
             createdAt: data.created_at,
           });
-          handleParse(data.raw_text, sharedName);
+          if (data.parsed_data && data.catalog_generation) {
+            // server-validated parse, current for the catalog: no re-parse needed
+            // (without a generation it is the sharer's unvalidated parse)
+            setParsedData(data.parsed_data);
+            saveList(sharedName, data.raw_text, data.parsed_data);
+          } else {
+            handleParse(data.raw_text, sharedName);
+          }
         } else {
           setError(data.error || "Failed to load shared list");
         }
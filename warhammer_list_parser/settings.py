@@ -225,9 +225,47 @@ CELERY_BEAT_SCHEDULE = {
         "task": "datasheet_scraper.tasks.full_scrape_task",
         "schedule": crontab(day_of_week=2, hour=4, minute=0),  # Tuesday at 4 AM UTC
     },
+    "flush-shared-list-views": {
+        "task": "list_parser.tasks.flush_shared_list_views_task",
+        "schedule": 60.0,  # every minute
+    },
 }
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
 
+# Fuzzy matching: rapidfuzz `workers` for batched scoring (-1 = all cores)
+FUZZY_MATCH_WORKERS = config("FUZZY_MATCH_WORKERS", default=-1, cast=int)
+
+# Detection result cache: in-process LRU entries, then Redis (keyed by catalog generation)
+DETECTION_CACHE_LOCAL_SIZE = config("DETECTION_CACHE_LOCAL_SIZE", default=256, cast=int)
+DETECTION_CACHE_TIMEOUT = 60 * 60 * 24 * 7  # 7 days
+
+# Full parses (uncached lists) per IP per window, shared by all detection endpoints
+DETECTION_WORK_LIMIT = config("DETECTION_WORK_LIMIT", default=50, cast=int)
+DETECTION_WORK_WINDOW = 60 * 60  # 1 hour
+
+# Batch detection: lists per request (uncached ones count against DETECTION_WORK_LIMIT)
+DETECTION_BATCH_MAX_LISTS = config("DETECTION_BATCH_MAX_LISTS", default=200, cast=int)
+
+# Datasheet scorer cascade (cheapest scorer first): skip the rest once a row reaches this score
+DATASHEET_CASCADE = config("DATASHEET_CASCADE", default=True, cast=bool)
+DATASHEET_CASCADE_CERTAINTY = config("DATASHEET_CASCADE_CERTAINTY", default=100, cast=int)
+
+# Header -> datasheet resolutions remembered across requests (per process)
+DATASHEET_MEMO_MAX_BYTES = config("DATASHEET_MEMO_MAX_BYTES", default=8 * 1024 * 1024, cast=int)
+
+# Shared-list view counts are buffered here (Redis hash) until the periodic flush
+VIEW_COUNT_REDIS_URL = config("REDIS_URL", default="redis://localhost:6379/0")
+
+# Serialized + precompressed shared-list responses (per slug and catalog generation)
+SHARED_LIST_PAYLOAD_TIMEOUT = 60 * 60 * 24 * 7  # 7 days
+
+# Matching pool: fuzzy matching runs in these processes (per web worker), 0 = inline
+MATCHING_POOL_WORKERS = config(
+    "MATCHING_POOL_WORKERS", default=max(1, (os.cpu_count() or 2) // 2), cast=int
+)
+MATCHING_POOL_QUEUE_SIZE = config("MATCHING_POOL_QUEUE_SIZE", default=8, cast=int)
+MATCHING_DEADLINE_SECONDS = config("MATCHING_DEADLINE_SECONDS", default=30, cast=float)
+
 # Rate Limiting Configuration
 RATELIMIT_VIEW = "list_parser.views.ratelimit_error"
 
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'warhammer_list_parser.settings')
 
 application = get_wsgi_application()
+
+# gunicorn imports this in each worker after forking: start that worker's matching
+# pool now, so the first request does not pay for spawning and catalog preload
+from list_parser.utils.matching_pool import start_matching_pool  # noqa: E402
+
+start_matching_pool()